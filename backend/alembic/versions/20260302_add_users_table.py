@@ -1,7 +1,7 @@
 """add users table
 
 Revision ID: add_users_table
-Revises: 20260215_0001_initial
+Revises: 20260215_0001
 Create Date: 2026-03-02 17:00:00.000000
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = 'add_users_table'
-down_revision: Union[str, None] = '20260215_0001_initial'
+down_revision: Union[str, None] = '20260215_0001'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
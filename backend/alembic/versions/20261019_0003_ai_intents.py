@@ -0,0 +1,38 @@
+"""persist ai intents
+
+Revision ID: 20261019_0003
+Revises: add_users_table
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_0003"
+down_revision = "add_users_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_intents",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("label", sa.String(length=128), nullable=False),
+        sa.Column("enabled", sa.Boolean(), nullable=False, server_default=sa.text("true")),
+        sa.Column("response", sa.Text(), nullable=False),
+    )
+    op.create_table(
+        "ai_intent_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ai_intent_state")
+    op.drop_table("ai_intents")
@@ -0,0 +1,108 @@
+"""partition bot_logs by timestamp
+
+Revision ID: 20261019_0004
+Revises: 20261019_0003
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_0004"
+down_revision = "20261019_0003"
+branch_labels = None
+depends_on = None
+# Copies every bot_logs row; app startup won't run this (see app.startup).
+heavy = True
+
+# Future partitions are created by app.log_partitions at runtime; the
+# migration only covers the months that already hold data plus the next two.
+PREMAKE_MONTHS = 2
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def _parse(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE bot_logs RENAME TO bot_logs_legacy")
+    op.execute("ALTER TABLE bot_logs_legacy RENAME CONSTRAINT bot_logs_pkey TO bot_logs_legacy_pkey")
+    # COLLATE "C" keeps range bounds on the fixed-width timestamp strings in
+    # plain byte order, independent of the database locale.
+    op.execute(
+        """
+        CREATE TABLE bot_logs (
+            id BIGINT NOT NULL,
+            timestamp VARCHAR(32) COLLATE "C" NOT NULL,
+            server VARCHAR(128) NOT NULL,
+            "user" VARCHAR(128) NOT NULL,
+            action VARCHAR(64) NOT NULL,
+            details TEXT NOT NULL,
+            level VARCHAR(16) NOT NULL,
+            CONSTRAINT bot_logs_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute("CREATE TABLE bot_logs_default PARTITION OF bot_logs DEFAULT")
+
+    low, high = bind.execute(sa.text("SELECT min(timestamp), max(timestamp) FROM bot_logs_legacy")).one()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    first = _month_start(_parse(low) or now)
+    last = _add_months(_month_start(max(_parse(high) or now, now)), PREMAKE_MONTHS)
+    month = first
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE bot_logs_p{month:%Y%m} PARTITION OF bot_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d %H:%M:%S}') TO ('{upper:%Y-%m-%d %H:%M:%S}')"
+        )
+        month = upper
+
+    op.execute("INSERT INTO bot_logs SELECT * FROM bot_logs_legacy")
+    op.execute("DROP TABLE bot_logs_legacy")
+    op.create_index("ix_bot_logs_timestamp", "bot_logs", ["timestamp"])
+    op.create_index("ix_bot_logs_action_timestamp", "bot_logs", ["action", "timestamp"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE bot_logs RENAME TO bot_logs_partitioned")
+    op.execute("ALTER TABLE bot_logs_partitioned RENAME CONSTRAINT bot_logs_pkey TO bot_logs_partitioned_pkey")
+    op.create_table(
+        "bot_logs",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("timestamp", sa.String(length=32), nullable=False),
+        sa.Column("server", sa.String(length=128), nullable=False),
+        sa.Column("user", sa.String(length=128), nullable=False),
+        sa.Column("action", sa.String(length=64), nullable=False),
+        sa.Column("details", sa.Text(), nullable=False),
+        sa.Column("level", sa.String(length=16), nullable=False),
+    )
+    op.execute("INSERT INTO bot_logs SELECT * FROM bot_logs_partitioned ON CONFLICT (id) DO NOTHING")
+    op.execute("DROP TABLE bot_logs_partitioned CASCADE")
@@ -0,0 +1,30 @@
+"""application command sync state
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_0007"
+down_revision = "20261019_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "app_command_sync",
+        sa.Column("scope_id", sa.BigInteger(), primary_key=True),
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("synced_at", sa.String(length=32), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("app_command_sync")
@@ -0,0 +1,30 @@
+"""per-guild daily active user sketches
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_0008"
+down_revision = "20261019_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "active_user_sketches",
+        sa.Column("guild_id", sa.BigInteger(), primary_key=True),
+        sa.Column("day", sa.String(length=10), primary_key=True),
+        sa.Column("registers", sa.LargeBinary(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("active_user_sketches")
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+import logging
+import math
+import time
+import zlib
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .metrics import REGISTRY
+from .models import ActiveUserSketchModel
+
+
+ALL_GUILDS = 0
+# 2^12 one-byte registers: 4 KiB per sketch before compression, ~1.6%
+# standard error on the estimate.
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+_RANK_BITS = 64 - PRECISION
+_RANK_MASK = (1 << _RANK_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_MASK64 = (1 << 64) - 1
+
+SKETCHES_FLUSHED = REGISTRY.counter("active_user_sketches_flushed_total", "Daily active-user sketches merged into the database.")
+
+
+def hash_user(user_id: int) -> int:
+    # splitmix64 finalizer: snowflakes are sequential, so they need mixing
+    # before their bits can stand in for a uniform hash.
+    z = (user_id + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class HyperLogLog:
+    __slots__ = ("registers",)
+
+    def __init__(self, registers: bytes | bytearray | None = None) -> None:
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    def add_hash(self, hashed: int) -> None:
+        index = hashed >> _RANK_BITS
+        rank = _RANK_BITS - (hashed & _RANK_MASK).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, user_id: int) -> None:
+        self.add_hash(hash_user(user_id))
+
+    def merge(self, other: HyperLogLog) -> None:
+        # Register-wise max is the union; merging is idempotent, so the same
+        # users arriving twice never inflate the count.
+        mine = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum(mine, np.frombuffer(other.registers, dtype=np.uint8), out=mine)
+
+    def estimate(self) -> int:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        raw = _ALPHA * REGISTERS * REGISTERS / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+        zeros = int(np.count_nonzero(registers == 0))
+        if raw <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate while most registers are empty.
+            return round(REGISTERS * math.log(REGISTERS / zeros))
+        return round(raw)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes(self.registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> HyperLogLog:
+        return cls(zlib.decompress(data))
+
+
+def _merge_into_db_sync(sketches: dict[tuple[int, str], HyperLogLog]) -> None:
+    session = SessionLocal()
+    try:
+        for (guild_id, day), sketch in sketches.items():
+            # Row lock so concurrent flushers from other workers can't drop
+            # each other's registers between read and write.
+            row = session.get(ActiveUserSketchModel, (guild_id, day), with_for_update=True)
+            if row is None:
+                session.add(ActiveUserSketchModel(guild_id=guild_id, day=day, registers=sketch.to_bytes()))
+                continue
+            stored = HyperLogLog.from_bytes(row.registers)
+            stored.merge(sketch)
+            row.registers = stored.to_bytes()
+        session.commit()
+    finally:
+        session.close()
+
+
+class ActiveUserTracker:
+    # Sketches are only held in memory until the next flush, which max-merges
+    # them into the stored row for the same (guild, day).
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self._pending: dict[tuple[int, str], HyperLogLog] = {}
+        self._day_index: int | None = None
+        self._day = ""
+        self._flush_lock = asyncio.Lock()
+
+    def _today(self, now: float) -> str:
+        index = int(now // 86400)
+        if index != self._day_index:
+            self._day_index = index
+            self._day = datetime.fromtimestamp(index * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+        return self._day
+
+    def _sketch(self, guild_id: int, day: str) -> HyperLogLog:
+        sketch = self._pending.get((guild_id, day))
+        if sketch is None:
+            sketch = self._pending[(guild_id, day)] = HyperLogLog()
+        return sketch
+
+    def record(self, guild_id: int, user_id: int, now: float | None = None) -> None:
+        day = self._today(time.time() if now is None else now)
+        hashed = hash_user(user_id)
+        self._sketch(guild_id, day).add_hash(hashed)
+        self._sketch(ALL_GUILDS, day).add_hash(hashed)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                await asyncio.to_thread(_merge_into_db_sync, pending)
+            except Exception:
+                for key, sketch in pending.items():
+                    self._sketch(*key).merge(sketch)
+                raise
+            SKETCHES_FLUSHED.inc(len(pending))
+            return len(pending)
+
+    def load(self, session: Session, days: list[str], guild_ids: list[int]) -> dict[str, HyperLogLog]:
+        # One merged sketch per day across the requested guilds, including
+        # anything recorded since the last flush.
+        merged = {day: HyperLogLog() for day in days}
+        wanted = set(guild_ids)
+        rows = (
+            session.query(ActiveUserSketchModel)
+            .filter(ActiveUserSketchModel.day.in_(days), ActiveUserSketchModel.guild_id.in_(wanted))
+            .all()
+        )
+        for row in rows:
+            merged[row.day].merge(HyperLogLog.from_bytes(row.registers))
+        for (guild_id, day), sketch in list(self._pending.items()):
+            if day in merged and guild_id in wanted:
+                merged[day].merge(sketch)
+        return merged
+
+    def active_users(
+        self, session: Session, end: date, days: int, guild_ids: list[int] | None = None
+    ) -> tuple[list[tuple[str, int]], int]:
+        # Per-day counts for the `days` days ending at `end`, plus the number
+        # of distinct users over the whole span.
+        names = [(end - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+        sketches = self.load(session, names, guild_ids or [ALL_GUILDS])
+        union = HyperLogLog()
+        for sketch in sketches.values():
+            union.merge(sketch)
+        return [(day, sketches[day].estimate()) for day in names], union.estimate()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to flush active-user sketches")
+
+
+active_users = ActiveUserTracker(flush_interval=settings.active_users_flush_seconds)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import time
+
+from fastapi import Depends, Header, HTTPException
+import jwt
+
+from .config import settings
+from .database import SessionLocal
+from .models import UserModel
+
+
+TOKEN_ALGORITHM = "HS256"
+TOKEN_LIFETIME_SECONDS = 30 * 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    username: str
+    email: str
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "username": self.username, "email": self.email}
+
+
+class UserCache:
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+
+    def get(self, user_id: int) -> CachedUser | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def put(self, user: CachedUser) -> None:
+        self._entries[user.id] = (time.monotonic() + self._ttl, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_cache = UserCache(settings.auth_user_cache_ttl_seconds, settings.auth_user_cache_size)
+
+
+def create_token(user_id: int, email: str) -> str:
+    now = int(datetime.now(timezone.utc).timestamp())
+    payload = {
+        "user_id": user_id,
+        "email": email,
+        "iat": now,
+        "exp": now + TOKEN_LIFETIME_SECONDS,
+    }
+    return jwt.encode(payload, settings.secret_key, algorithm=TOKEN_ALGORITHM)
+
+
+def verify_token(token: str) -> dict | None:
+    try:
+        payload = jwt.decode(
+            token,
+            settings.secret_key,
+            algorithms=[TOKEN_ALGORITHM],
+            options={"require": ["exp", "user_id"]},
+        )
+    except jwt.PyJWTError:
+        return None
+    if not isinstance(payload.get("user_id"), int):
+        return None
+    return payload
+
+
+def _load_active_user_sync(user_id: int) -> CachedUser | None:
+    session = SessionLocal()
+    try:
+        row = session.get(UserModel, user_id)
+        if row is None or not row.is_active:
+            return None
+        return CachedUser(id=row.id, username=row.username, email=row.email)
+    finally:
+        session.close()
+
+
+async def load_active_user(user_id: int) -> CachedUser | None:
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = await asyncio.to_thread(_load_active_user_sync, user_id)
+    if user is not None:
+        user_cache.put(user)
+    return user
+
+
+def remember_user(row: UserModel) -> CachedUser:
+    user = CachedUser(id=row.id, username=row.username, email=row.email)
+    if row.is_active:
+        user_cache.put(user)
+    else:
+        user_cache.invalidate(row.id)
+    return user
+
+
+def request_token(authorization: str | None = Header(default=None), token: str | None = None) -> str | None:
+    # A bearer Authorization header, or the ?token= query parameter.
+    if authorization:
+        scheme, _, value = authorization.partition(" ")
+        if scheme.lower() == "bearer" and value:
+            return value.strip()
+    return token or None
+
+
+async def require_user(raw: str | None = Depends(request_token)) -> CachedUser:
+    if not raw:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    payload = verify_token(raw)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    user = await load_active_user(payload["user_id"])
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found or disabled")
+    return user
+
+
+def is_admin(user: CachedUser) -> bool:
+    admins = {email.strip().lower() for email in settings.admin_emails.split(",") if email.strip()}
+    return user.email.lower() in admins
+
+
+async def require_admin(user: CachedUser = Depends(require_user)) -> CachedUser:
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Awaitable, Callable
+
+import discord
+
+from .database import query_scope
+from .metrics import REGISTRY
+
+
+# Discord's bulk-delete endpoint takes 2-100 messages, none older than 14 days.
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+# Slack so a message can't cross the cutoff between our check and Discord's.
+_AGE_MARGIN = timedelta(minutes=5)
+
+AUTOMOD_DELETES = REGISTRY.counter(
+    "automod_deletes_total", "Messages automod tried to delete, by how the delete went out.", ("method",)
+)
+AUTOMOD_DELETE_BATCH = REGISTRY.histogram(
+    "automod_delete_batch_size", "Messages per automod deletion batch.", buckets=(1, 2, 5, 10, 25, 50, 100)
+)
+
+LogAction = Callable[..., Awaitable[None]]
+
+
+class AutomodDeleteBatcher:
+    # Violations are held per channel for `window` seconds (or until 100
+    # arrive) and then removed with one bulk delete, so a spam wave costs a
+    # handful of REST calls instead of one rate-limited call per message.
+    def __init__(self, window: float, log_action: LogAction) -> None:
+        self.window = window
+        self._log_action = log_action
+        self._pending: dict[int, list[tuple[discord.Message, str]]] = {}
+        self._timers: dict[int, asyncio.Task[None]] = {}
+        self._flushing: set[asyncio.Task[None]] = set()
+
+    def add(self, message: discord.Message, reason: str) -> None:
+        channel_id = message.channel.id
+        batch = self._pending.setdefault(channel_id, [])
+        batch.append((message, reason))
+        if len(batch) >= BULK_DELETE_LIMIT:
+            timer = self._timers.pop(channel_id, None)
+            if timer is not None:
+                timer.cancel()
+            # Taken now so messages arriving before the task runs start a new batch.
+            task = asyncio.create_task(self._flush_batch(self._pending.pop(channel_id)))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+        elif channel_id not in self._timers:
+            self._timers[channel_id] = asyncio.create_task(self._flush_later(channel_id))
+
+    async def _flush_later(self, channel_id: int) -> None:
+        await asyncio.sleep(self.window)
+        self._timers.pop(channel_id, None)
+        await self._flush(channel_id)
+
+    async def _flush(self, channel_id: int) -> None:
+        batch = self._pending.pop(channel_id, None)
+        if batch:
+            await self._flush_batch(batch)
+
+    async def _flush_batch(self, batch: list[tuple[discord.Message, str]]) -> None:
+        try:
+            with query_scope("automod:delete"):
+                failed = await self._delete([message for message, _ in batch])
+                await self._log_batch(batch, failed)
+        except Exception:
+            logging.exception("Failed to flush automod deletions")
+
+    async def _delete(self, messages: list[discord.Message]) -> int:
+        AUTOMOD_DELETE_BATCH.observe(len(messages))
+        channel = messages[0].channel
+        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE + _AGE_MARGIN
+        fresh = [message for message in messages if message.created_at > cutoff]
+        singles = [message for message in messages if message.created_at <= cutoff]
+        if len(fresh) > 1 and hasattr(channel, "delete_messages"):
+            for start in range(0, len(fresh), BULK_DELETE_LIMIT):
+                chunk = fresh[start:start + BULK_DELETE_LIMIT]
+                if len(chunk) == 1:
+                    singles.extend(chunk)
+                    continue
+                try:
+                    await channel.delete_messages(chunk, reason="Automod")
+                    AUTOMOD_DELETES.labels("bulk").inc(len(chunk))
+                except discord.Forbidden:
+                    # Single deletes need the same permission; don't retry.
+                    logging.warning("Missing permissions to bulk delete %s automod messages", len(chunk))
+                    AUTOMOD_DELETES.labels("failed").inc(len(chunk))
+                    return len(chunk) + await self._delete_each(singles)
+                except (discord.HTTPException, discord.ClientException):
+                    logging.warning("Bulk delete of %s automod messages failed; deleting one by one", len(chunk))
+                    singles.extend(chunk)
+        else:
+            singles.extend(fresh)
+        return await self._delete_each(singles)
+
+    async def _delete_each(self, messages: list[discord.Message]) -> int:
+        failed = 0
+        for message in messages:
+            try:
+                await message.delete()
+                AUTOMOD_DELETES.labels("single").inc()
+            except discord.NotFound:
+                AUTOMOD_DELETES.labels("single").inc()
+            except discord.Forbidden:
+                logging.warning("Missing permissions to delete automod message")
+                AUTOMOD_DELETES.labels("failed").inc()
+                failed += 1
+            except discord.HTTPException:
+                logging.exception("Failed to delete automod message")
+                AUTOMOD_DELETES.labels("failed").inc()
+                failed += 1
+        return failed
+
+    async def _log_batch(self, batch: list[tuple[discord.Message, str]], failed: int) -> None:
+        message, reason = batch[0]
+        server = message.guild.name if message.guild else ""
+        if len(batch) == 1:
+            await self._log_action("automod", f"{reason}: {message.content}", server=server, user=str(message.author))
+            return
+        # One summary record per batch instead of a row per message.
+        reasons = Counter(reason for _, reason in batch)
+        authors = {str(message.author) for message, _ in batch}
+        summary = ", ".join(f"{name} x{count}" for name, count in reasons.most_common())
+        deleted = f"{len(batch) - failed} of {len(batch)}" if failed else str(len(batch))
+        details = f"Deleted {deleted} messages in #{message.channel.name}: {summary}"
+        user = next(iter(authors)) if len(authors) == 1 else f"{len(authors)} users"
+        await self._log_action("automod", details, server=server, user=user)
+
+    async def close(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for channel_id in list(self._pending):
+            await self._flush(channel_id)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
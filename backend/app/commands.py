@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import re
+import time
+from typing import Hashable
+
+from .config import settings
+from .database import SessionLocal
+from .metrics import REGISTRY
+from .models import CommandModel, ServerSettingsModel
+
+
+COMMANDS_THROTTLED = REGISTRY.counter("commands_throttled_total", "Prefix commands rejected by their cooldown.", ("command",))
+COOLDOWN_ENTRIES = REGISTRY.gauge("command_cooldown_entries", "Live entries in the command cooldown tracker.")
+
+_COOLDOWN_PART = re.compile(r"(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?", re.IGNORECASE)
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+
+
+def parse_cooldown(value: str | None) -> float:
+    # Accepts "0s", "30", "1m30s", "2h"; anything unparseable means no cooldown.
+    text = (value or "").strip().replace(" ", "")
+    if not text:
+        return 0.0
+    total = 0.0
+    position = 0
+    while position < len(text):
+        match = _COOLDOWN_PART.match(text, position)
+        if not match or match.end() == position:
+            return 0.0
+        total += float(match.group(1)) * _UNIT_SECONDS[(match.group(2) or "s").lower()]
+        position = match.end()
+    return total
+
+
+@dataclass(frozen=True)
+class CommandSpec:
+    name: str
+    response: str | None
+    enabled: bool
+    cooldown: float
+
+
+@dataclass(frozen=True)
+class CommandCatalog:
+    commands: dict[str, CommandSpec] = field(default_factory=dict)
+
+    def get(self, name: str) -> CommandSpec | None:
+        return self.commands.get(name)
+
+
+class CommandStore:
+    def __init__(self, refresh_interval: float | None = None) -> None:
+        self._catalog = CommandCatalog()
+        self._checked_at = float("-inf")
+        self._refresh_interval = (
+            settings.command_refresh_seconds if refresh_interval is None else refresh_interval
+        )
+        self._refresh_lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._checked_at = float("-inf")
+
+    def peek(self) -> CommandCatalog:
+        # Whatever is cached, without a refresh; for sync callers.
+        return self._catalog
+
+    async def get_catalog(self) -> CommandCatalog:
+        if time.monotonic() - self._checked_at < self._refresh_interval:
+            return self._catalog
+        async with self._refresh_lock:
+            if time.monotonic() - self._checked_at < self._refresh_interval:
+                return self._catalog
+            self._catalog = await asyncio.to_thread(self._load_catalog_sync)
+            self._checked_at = time.monotonic()
+        return self._catalog
+
+    def _load_catalog_sync(self) -> CommandCatalog:
+        session = SessionLocal()
+        try:
+            rows = session.query(CommandModel).all()
+            return CommandCatalog(
+                commands={
+                    row.name: CommandSpec(
+                        name=row.name,
+                        response=row.description or None,
+                        enabled=bool(row.enabled),
+                        cooldown=parse_cooldown(row.cooldown),
+                    )
+                    for row in rows
+                }
+            )
+        finally:
+            session.close()
+
+
+DEFAULT_PREFIX = "!"
+
+
+class PrefixStore:
+    # One query loads every guild's prefix; the message path then does a dict
+    # lookup instead of a SELECT per message.
+    def __init__(self, refresh_interval: float | None = None) -> None:
+        self._prefixes: dict[int, str] = {}
+        self._checked_at = float("-inf")
+        self._refresh_interval = (
+            settings.prefix_refresh_seconds if refresh_interval is None else refresh_interval
+        )
+        self._refresh_lock = asyncio.Lock()
+
+    def set(self, guild_id: int, prefix: str) -> None:
+        self._prefixes = {**self._prefixes, guild_id: prefix or DEFAULT_PREFIX}
+
+    def peek(self, guild_id: int) -> str:
+        return self._prefixes.get(guild_id, DEFAULT_PREFIX)
+
+    async def get_prefix(self, guild_id: int) -> str:
+        return (await self.get_prefixes()).get(guild_id, DEFAULT_PREFIX)
+
+    async def get_prefixes(self) -> dict[int, str]:
+        if time.monotonic() - self._checked_at < self._refresh_interval:
+            return self._prefixes
+        async with self._refresh_lock:
+            if time.monotonic() - self._checked_at < self._refresh_interval:
+                return self._prefixes
+            self._prefixes = await asyncio.to_thread(self._load_prefixes_sync)
+            self._checked_at = time.monotonic()
+        return self._prefixes
+
+    def _load_prefixes_sync(self) -> dict[int, str]:
+        session = SessionLocal()
+        try:
+            rows = session.query(ServerSettingsModel.guild_id, ServerSettingsModel.prefix).all()
+            return {guild_id: prefix or DEFAULT_PREFIX for guild_id, prefix in rows}
+        finally:
+            session.close()
+
+
+class CooldownTracker:
+    # Expiring map with a timing wheel for lazy cleanup: each key is also
+    # filed under the wheel slot of its expiry tick, and slots are swept as
+    # time passes them, so the map only holds live cooldowns (plus at most
+    # one wheel turn of stragglers) and every check is amortised O(1).
+    def __init__(self, resolution: float = 1.0, slots: int = 512, max_entries: int = 100_000) -> None:
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self._expiry: dict[Hashable, float] = {}
+        self._wheel: list[list[Hashable]] = [[] for _ in range(slots)]
+        self._tick: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def remaining(self, key: Hashable, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        expiry = self._expiry.get(key)
+        return expiry - now if expiry is not None and expiry > now else 0.0
+
+    def hit(self, key: Hashable, cooldown: float, now: float | None = None) -> float:
+        # Returns 0.0 and starts the cooldown if the key is free, otherwise
+        # the seconds left without touching the existing window.
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+        expiry = self._expiry.get(key)
+        if expiry is not None:
+            if expiry > now:
+                return expiry - now
+            del self._expiry[key]
+        if cooldown <= 0:
+            return 0.0
+        if len(self._expiry) >= self.max_entries:
+            # Oldest insertion first; losing a cooldown early is the safe failure.
+            del self._expiry[next(iter(self._expiry))]
+        expiry = now + cooldown
+        self._expiry[key] = expiry
+        self._wheel[int(expiry / self.resolution) % len(self._wheel)].append(key)
+        return 0.0
+
+    def _advance(self, now: float) -> None:
+        tick = int(now / self.resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+        steps = min(tick - self._tick, len(self._wheel))
+        for offset in range(1, steps + 1):
+            index = (self._tick + offset) % len(self._wheel)
+            slot = self._wheel[index]
+            if not slot:
+                continue
+            keep = []
+            for key in slot:
+                expiry = self._expiry.get(key)
+                if expiry is None:
+                    continue
+                if expiry <= now:
+                    del self._expiry[key]
+                elif int(expiry / self.resolution) % len(self._wheel) == index:
+                    # Longer than one wheel turn; wait for the next pass.
+                    keep.append(key)
+            self._wheel[index] = keep
+        if steps:
+            self._tick = tick
+            COOLDOWN_ENTRIES.set(len(self._expiry))
+
+
+command_store = CommandStore()
+prefix_store = PrefixStore()
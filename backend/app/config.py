@@ -15,14 +15,125 @@ class Settings(BaseSettings):
     groq_model: str = "llama3-70b-8192"
     groq_base_url: str = "https://api.groq.com/openai/v1"
     secret_key: str = "your-secret-key-change-in-production"
+    # Comma-separated emails of accounts allowed to use admin routes.
+    admin_emails: str = ""
+    ai_intent_refresh_seconds: float = 5.0
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 16
+    auth_user_cache_ttl_seconds: float = 60.0
+    auth_user_cache_size: int = 1024
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.25
+    loop_stall_threshold_seconds: float = 0.1
+    profile_max_seconds: float = 60.0
+    profile_min_interval_seconds: float = 60.0
+    sql_slow_query_ms: float = 200.0
+    sql_repeat_threshold: int = 5
+    sql_debug_header: bool = False
+    log_partition_interval: str = "month"
+    log_partition_premake: int = 2
+    log_partition_maintenance_seconds: float = 3600.0
+    log_retention_days: int = 0
+    log_retention_action: str = "drop"
+    log_archive_enabled: bool = False
+    log_archive_dir: str = "archive/bot_logs"
+    log_archive_after_days: int = 90
+    log_archive_segment_rows: int = 100_000
+    log_archive_interval_seconds: float = 3600.0
+    guild_settings_cache_size: int = 2048
+    guild_settings_ttl_seconds: float = 300.0
+    leveling_flush_seconds: float = 10.0
+    leveling_idle_seconds: float = 3600.0
+    command_refresh_seconds: float = 30.0
+    command_cooldown_per_channel: bool = False
+    prefix_refresh_seconds: float = 60.0
+    app_commands_enabled: bool = False
+    app_commands_scope: str = "global"
+    app_commands_sync_delay_seconds: float = 2.0
+    # "upgrade" migrates to head at startup (adopting databases built before
+    # migrations were tracked), stopping short of heavy migrations, which
+    # must be run with `alembic upgrade head`; "check" only verifies the
+    # revision.
+    db_schema_mode: str = "upgrade"
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 10.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: str = "idle"
+    db_pool_ping_idle_seconds: float = 30.0
+    db_prepare_threshold: int | None = 2
+    db_prepared_max: int = 100
+    db_statement_timeout_ms: int = 15000
+    database_replica_url: str | None = None
+    db_replica_max_lag_seconds: float = 5.0
+    db_replica_lag_check_seconds: float = 2.0
+    timeseries_max_buckets: int = 5000
+    timeseries_max_span_days: float = 3660.0
+    heavy_hitters_capacity: int = 64
+    heavy_hitters_global_capacity: int = 1024
+    heavy_hitters_window_seconds: float = 21600.0
+    heavy_hitters_windows: int = 28
+    active_users_flush_seconds: float = 60.0
+    event_recording_path: str | None = None
+    event_recording_salt: str = ""
+    event_recording_buffer: int = 50_000
+    pipeline_workers: int = 32
+    pipeline_command_shed_depth: int = 5000
+    pipeline_cosmetic_shed_depth: int = 1000
+    automod_delete_window_seconds: float = 1.0
 
-    @field_validator("discord_guild_id", "discord_default_channel_id", mode="before")
+    @field_validator("discord_guild_id", "discord_default_channel_id", "database_replica_url", "event_recording_path", mode="before")
     @classmethod
     def _empty_to_none(cls, value):
         if value == "" or value is None:
             return None
         return value
 
+    @field_validator("log_partition_interval")
+    @classmethod
+    def _valid_partition_interval(cls, value):
+        if value not in ("day", "month"):
+            raise ValueError("log_partition_interval must be 'day' or 'month'")
+        return value
+
+    @field_validator("log_retention_action")
+    @classmethod
+    def _valid_retention_action(cls, value):
+        if value not in ("drop", "detach"):
+            raise ValueError("log_retention_action must be 'drop' or 'detach'")
+        return value
+
+    @field_validator("app_commands_scope")
+    @classmethod
+    def _valid_app_commands_scope(cls, value):
+        if value not in ("global", "guild"):
+            raise ValueError("app_commands_scope must be 'global' or 'guild'")
+        return value
+
+    @field_validator("db_schema_mode")
+    @classmethod
+    def _valid_db_schema_mode(cls, value):
+        if value not in ("check", "upgrade", "create_all"):
+            raise ValueError("db_schema_mode must be 'check', 'upgrade' or 'create_all'")
+        return value
+
+    @field_validator("db_pool_pre_ping")
+    @classmethod
+    def _valid_pre_ping(cls, value):
+        if value not in ("always", "idle", "never"):
+            raise ValueError("db_pool_pre_ping must be 'always', 'idle' or 'never'")
+        return value
+
+    @field_validator("db_prepare_threshold", mode="before")
+    @classmethod
+    def _empty_prepare_threshold(cls, value):
+        # Unset/empty disables server-side prepares (needed behind PgBouncer
+        # in transaction mode).
+        if value == "" or value is None:
+            return None
+        return value
+
     @field_validator("database_url", mode="before")
     @classmethod
     def _default_database_url(cls, value):
@@ -1,18 +1,343 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import functools
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import QueuePool
 
 from .config import settings
+from .metrics import (
+    DB_CONNECTIONS_IN_USE,
+    DB_CONNECTION_HOLD_SECONDS,
+    DB_POOL_OVERFLOW,
+    DB_POOL_PINGS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_UTILIZATION,
+    DB_POOL_WAIT_SECONDS,
+    DB_READ_ROUTES,
+    DB_REPLICA_LAG_SECONDS,
+    DB_SCOPE_SECONDS,
+    DB_SCOPE_STATEMENTS,
+    DB_STATEMENT_SECONDS,
+    REGISTRY,
+)
+
+
+T = TypeVar("T")
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+class TimedQueuePool(QueuePool):
+    # QueuePool has no "waiting" event, so time the blocking get directly.
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {}
+    options: dict = {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping == "always",
+    }
+    if parsed.get_driver_name() == "psycopg":
+        connect_args: dict = {"prepare_threshold": settings.db_prepare_threshold}
+        if settings.db_statement_timeout_ms > 0:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        options["connect_args"] = connect_args
+    return options
+
+
+def _configure_connection(dbapi_connection, _connection_record) -> None:
+    # psycopg keeps up to prepared_max server-side statements per connection
+    # and prepares a query once it has run prepare_threshold times.
+    if hasattr(dbapi_connection, "prepared_max"):
+        dbapi_connection.prepared_max = settings.db_prepared_max
+
+
+def _ping_idle_connection(dbapi_connection, connection_record, _connection_proxy) -> None:
+    # Cheaper than pool_pre_ping: only connections that sat idle long enough
+    # to have been dropped by a proxy or failover get the extra round-trip.
+    returned_at = connection_record.info.get("returned_at")
+    if returned_at is None or time.monotonic() - returned_at < settings.db_pool_ping_idle_seconds:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        DB_POOL_PINGS.labels("ok").inc()
+    except Exception as error:
+        DB_POOL_PINGS.labels("failed").inc()
+        raise exc.DisconnectionError() from error
+    finally:
+        cursor.close()
+
+
+def _mark_returned(_dbapi_connection, connection_record) -> None:
+    connection_record.info["returned_at"] = time.monotonic()
+
+
+def build_engine(url: str) -> Engine:
+    built = create_engine(url, **engine_options(url))
+    event.listen(built, "connect", _configure_connection)
+    if settings.db_pool_pre_ping == "idle" and isinstance(built.pool, QueuePool):
+        event.listen(built, "checkout", _ping_idle_connection)
+        event.listen(built, "checkin", _mark_returned)
+    return built
+
+
+engine = build_engine(settings.database_url)
+replica_engine = build_engine(settings.database_replica_url) if settings.database_replica_url else None
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Zero on a primary (so a second standalone database works for local
+# testing); NULL on a standby that has not replayed anything yet.
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaMonitor:
+    def __init__(self, replica: Engine | None) -> None:
+        self.replica = replica
+        self.lag: float | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def healthy(self) -> bool:
+        if self.replica is None:
+            return False
+        if time.monotonic() - self._checked_at >= settings.db_replica_lag_check_seconds and self._lock.acquire(
+            blocking=False
+        ):
+            # One thread re-measures; the rest keep using the last answer.
+            try:
+                self.lag = self._measure_lag()
+            finally:
+                self._checked_at = time.monotonic()
+                self._lock.release()
+        return self.lag is not None and self.lag <= settings.db_replica_max_lag_seconds
+
+    def _measure_lag(self) -> float | None:
+        try:
+            with self.replica.connect() as conn:
+                if conn.dialect.name != "postgresql":
+                    lag = 0.0
+                else:
+                    value = conn.execute(_REPLICA_LAG_SQL).scalar()
+                    lag = None if value is None else max(0.0, float(value))
+        except Exception:
+            logging.warning("Read replica unavailable; reading from the primary", exc_info=True)
+            return None
+        if lag is not None:
+            DB_REPLICA_LAG_SECONDS.set(lag)
+        return lag
+
+    def choose(self) -> Engine:
+        target = self.replica if self.healthy() else engine
+        DB_READ_ROUTES.labels("replica" if target is not engine else "primary").inc()
+        return target
+
+
+replica_monitor = ReplicaMonitor(replica_engine)
+
+
+class ReadSession(Session):
+    # For handlers that tolerate staleness. The read engine is picked once
+    # per session so a request never mixes replica and primary snapshots;
+    # flushes and explicit DML still go to the primary.
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._read_bind = replica_monitor.choose() if replica_engine is not None else engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            return engine
+        return self._read_bind
+
+
+ReadSessionLocal = sessionmaker(class_=ReadSession, autoflush=False, autocommit=False)
+
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK"}
+_MAX_TRACKED_SHAPES = 256
+
+
+@dataclass
+class QueryStats:
+    label: str
+    statements: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    shapes: dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float, rowcount: int) -> None:
+        self.statements += 1
+        self.seconds += elapsed
+        if rowcount > 0:
+            self.rows += rowcount
+        # Bound parameters are not inlined, so identical text means an
+        # identical statement shape issued again.
+        if statement in self.shapes or len(self.shapes) < _MAX_TRACKED_SHAPES:
+            self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(sql, count) for sql, count in self.shapes.items() if count >= threshold]
+
+    def header_value(self) -> str:
+        repeated = len(self.repeated(settings.sql_repeat_threshold))
+        return f"count={self.statements}; time_ms={self.seconds * 1000:.2f}; rows={self.rows}; repeated={repeated}"
+
+    def finish(self) -> None:
+        if not self.statements:
+            return
+        DB_SCOPE_STATEMENTS.labels(self.label).observe(self.statements)
+        DB_SCOPE_SECONDS.labels(self.label).observe(self.seconds)
+        for sql, count in self.repeated(settings.sql_repeat_threshold):
+            logging.warning("Possible N+1 in %s: statement ran %d times: %s", self.label, count, _shorten(sql))
+
+
+_current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def _shorten(value: object, limit: int = 500) -> str:
+    text = " ".join(str(value).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current_query_stats.get()
+
+
+@contextmanager
+def query_scope(label: str) -> Iterator[QueryStats]:
+    stats = QueryStats(label=label)
+    token = _current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_query_stats.reset(token)
+        stats.finish()
+
+
+def with_query_scope(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    label = f"event:{func.__name__}"
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        with query_scope(label):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _on_checkout(_dbapi_connection, connection_record, _connection_proxy) -> None:
+    connection_record.info["checked_out_at"] = time.perf_counter()
+    DB_CONNECTIONS_IN_USE.inc()
+
+
+def _on_checkin(_dbapi_connection, connection_record) -> None:
+    started = connection_record.info.pop("checked_out_at", None)
+    if started is not None:
+        DB_CONNECTION_HOLD_SECONDS.observe(time.perf_counter() - started)
+        DB_CONNECTIONS_IN_USE.dec()
+
+
+def _before_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany) -> None:
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(_conn, cursor, statement, parameters, context, _executemany) -> None:
+    elapsed = time.perf_counter() - context._metrics_started
+    kind = statement.lstrip()[:8].split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_STATEMENT_SECONDS.labels(kind if kind in _STATEMENT_KINDS else "OTHER").observe(elapsed)
+    stats = _current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed, getattr(cursor, "rowcount", -1) or 0)
+    if elapsed * 1000 >= settings.sql_slow_query_ms:
+        logging.warning(
+            "Slow query (%.1f ms) in %s: %s params=%s",
+            elapsed * 1000,
+            stats.label if stats else "<unscoped>",
+            _shorten(statement),
+            _shorten(parameters, 300),
+        )
+
+
+def _instrument(target: Engine) -> None:
+    event.listen(target, "checkout", _on_checkout)
+    event.listen(target, "checkin", _on_checkin)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+_instrument(engine)
+if replica_engine is not None:
+    _instrument(replica_engine)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with query_scope(f"{scope.get('method', 'GET')} {scope.get('path', '')}") as stats:
+
+            async def send_wrapper(message) -> None:
+                if message["type"] == "http.response.start":
+                    route = scope.get("route")
+                    if route is not None:
+                        stats.label = f"{scope.get('method', 'GET')} {route.path}"
+                    if settings.sql_debug_header:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"x-db-queries", stats.header_value().encode()))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def _collect_pool() -> None:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    capacity = pool.size() + max(0, pool._max_overflow)
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+    DB_POOL_UTILIZATION.set(pool.checkedout() / capacity if capacity else 0.0)
+
+
+REGISTRY.add_collector(_collect_pool)
+
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
@@ -8,9 +8,19 @@ from typing import Iterable
 
 import discord
 
+from .automod_deletes import AutomodDeleteBatcher
+from .commands import COMMANDS_THROTTLED, CommandSpec, CooldownTracker, command_store, prefix_store
 from .config import settings
-from .database import SessionLocal
-from .models import BotSettingsModel, LogEntryModel, CommandModel, ServerSettingsModel
+from .database import SessionLocal, with_query_scope
+from .active_users import active_users
+from .event_recorder import event_recorder
+from .guild_settings import AutomodRules, GuildConfig, GuildConfigCache, LevelingRules
+from .heavy_hitters import activity_tracker
+from .leveling import LevelUp, xp_engine
+from .metrics import discord_trace_config, observe_event, observe_operation
+from .models import BotSettingsModel, LogEntryModel, CommandModel
+from .pipeline import Priority, build_pipeline
+from .slash_commands import SlashCommandSync
 
 
 DEFAULT_SETTINGS = {
@@ -37,74 +47,70 @@ class DiscordBotManager:
         intents.members = True
         intents.messages = True
         intents.message_content = True
-        self.client = discord.Client(intents=intents)
+        self.client = discord.Client(intents=intents, http_trace=discord_trace_config())
         self._ready_event = asyncio.Event()
         self._settings = DEFAULT_SETTINGS
         self._settings_lock = asyncio.Lock()
+        self.guild_configs = GuildConfigCache(
+            DEFAULT_SETTINGS,
+            max_size=settings.guild_settings_cache_size,
+            ttl=settings.guild_settings_ttl_seconds,
+        )
         self._refresh_task: asyncio.Task[None] | None = None
-
-        @self.client.event
+        self.cooldowns = CooldownTracker()
+        self.slash = SlashCommandSync(self.client, self._handle_app_command)
+        self.pipeline = build_pipeline()
+        self.automod_deletes = AutomodDeleteBatcher(
+            settings.automod_delete_window_seconds,
+            lambda *args, **kwargs: self._log_action(*args, **kwargs),
+        )
+        self._last_log_id = 0
+        event_recorder.set_automod_source(self._cached_automod)
+        xp_engine.set_late_level_up_listener(self._queue_level_up)
+
+        @self._event
         async def on_ready() -> None:  # type: ignore[override]
             self._ready_event.set()
             if self._refresh_task is None or self._refresh_task.done():
                 self._refresh_task = asyncio.create_task(self._periodic_refresh())
             await self.refresh_settings()
+            self.slash.schedule(command_store.get_catalog)
 
-        @self.client.event
+        # Handlers only enqueue; the work runs on the pipeline's workers in
+        # per-guild order, moderation first.
+        @self._event
         async def on_message(message: discord.Message) -> None:  # type: ignore[override]
             if message.author.bot or message.guild is None:
                 return
-            settings_snapshot = await self.get_settings()
-            reason = self._violates_automod(message, settings_snapshot.get("automod", {}))
-            if reason:
-                try:
-                    await message.delete()
-                except discord.Forbidden:
-                    logging.warning("Missing permissions to delete message: %s", reason)
-                except discord.HTTPException:
-                    logging.exception("Failed to delete message: %s", reason)
-                await self._log_action("automod", f"{reason}: {message.content}", server=message.guild.name)
-                return
-
-            await self._handle_prefix_command(message)
+            self.pipeline.submit(message.guild.id, Priority.MODERATION, "moderation", self._moderate, message)
 
-        @self.client.event
+        @self._event
         async def on_member_join(member: discord.Member) -> None:  # type: ignore[override]
-            settings_snapshot = await self.get_settings()
-            welcome = settings_snapshot.get("welcome", {})
-            if not welcome.get("enabled"):
-                return
-            channel = self._resolve_channel(member.guild, welcome.get("channel", ""))
-            if channel:
-                content = self._format_template(welcome.get("message", ""), member)
-                await channel.send(content)
-            if welcome.get("dmOnJoin"):
-                try:
-                    await member.send(self._format_template(welcome.get("message", ""), member))
-                except discord.Forbidden:
-                    logging.warning("Missing permissions to DM member on join")
-            await self._log_action("join", f"{member.display_name} joined", server=member.guild.name)
-
-        @self.client.event
+            self.pipeline.submit(member.guild.id, Priority.COSMETIC, "welcome", self._welcome, member)
+
+        @self._event
         async def on_member_remove(member: discord.Member) -> None:  # type: ignore[override]
-            settings_snapshot = await self.get_settings()
-            leave = settings_snapshot.get("leave", {})
-            if not leave.get("enabled"):
-                return
-            channel = self._resolve_channel(member.guild, leave.get("channel", ""))
-            if channel:
-                content = self._format_template(leave.get("message", ""), member)
-                await channel.send(content)
-            await self._log_action("leave", f"{member.display_name} left", server=member.guild.name)
+            self.pipeline.submit(member.guild.id, Priority.COSMETIC, "farewell", self._farewell, member)
 
-        @self.client.event
+        @self._event
         async def on_guild_join(guild: discord.Guild) -> None:  # type: ignore[override]
+            self.slash.schedule(command_store.get_catalog, [guild.id])
             await self._log_action("server_join", f"{guild.name} added", server=guild.name)
 
-        @self.client.event
+        @self._event
         async def on_guild_remove(guild: discord.Guild) -> None:  # type: ignore[override]
             await self._log_action("server_leave", f"{guild.name} removed", server=guild.name)
 
+    def _event(self, func):
+        handler = observe_event(with_query_scope(func))
+        if event_recorder.enabled:
+            handler = event_recorder.wrap(func.__name__, handler)
+        return self.client.event(handler)
+
+    def _cached_automod(self, guild_id: int) -> AutomodRules | None:
+        config = self.guild_configs.peek(guild_id)
+        return config.automod if config is not None else None
+
     async def start(self) -> None:
         if self.client.is_closed():
             raise RuntimeError("Discord client is closed.")
@@ -118,8 +124,11 @@ class DiscordBotManager:
     async def close(self) -> None:
         if not self.client.is_closed():
             await self.client.close()
+        await self.pipeline.close()
+        await self.automod_deletes.close()
         if self._refresh_task is not None:
             self._refresh_task.cancel()
+        await self.slash.close()
 
     async def wait_until_ready(self, timeout: float = 20.0) -> None:
         await asyncio.wait_for(self._ready_event.wait(), timeout=timeout)
@@ -159,12 +168,23 @@ class DiscordBotManager:
         new_settings = await asyncio.to_thread(self._load_settings_sync)
         async with self._settings_lock:
             self._settings = new_settings
+        self.guild_configs.set_defaults(new_settings)
         await self._apply_presence(new_settings.get("general", {}))
 
     async def get_settings(self) -> dict:
         async with self._settings_lock:
             return self._settings
 
+    async def guild_config(self, guild_id: int) -> GuildConfig:
+        config = self.guild_configs.peek(guild_id)
+        if config is not None:
+            return config
+        return await self.guild_configs.get(guild_id)
+
+    def commands_changed(self) -> None:
+        command_store.invalidate()
+        self.slash.schedule(command_store.get_catalog)
+
     async def _periodic_refresh(self) -> None:
         while not self.client.is_closed():
             try:
@@ -232,35 +252,123 @@ class DiscordBotManager:
             cleaned = cleaned[1:]
         return discord.utils.get(guild.text_channels, name=cleaned)
 
+    def _resolve_role(self, guild: discord.Guild, value: str) -> discord.Role | None:
+        cleaned = value.strip()
+        if cleaned.startswith("<@&") and cleaned.endswith(">"):
+            cleaned = cleaned[3:-1]
+        if cleaned.isdigit():
+            return guild.get_role(int(cleaned))
+        if cleaned.startswith("@"):
+            cleaned = cleaned[1:]
+        return discord.utils.get(guild.roles, name=cleaned)
+
+    async def _moderate(self, message: discord.Message) -> None:
+        guild_id = message.guild.id
+        config = await self.guild_config(guild_id)
+        reason = self._violates_automod(message, config.automod)
+        if reason:
+            # Deleted and logged with the rest of the channel's batch.
+            self.automod_deletes.add(message, reason)
+            return
+
+        activity_tracker.record_message(guild_id, message.author.id, str(message.author))
+        active_users.record(guild_id, message.author.id)
+
+        # Follow-up stages are queued only once the message has passed
+        # automod, so they can never act on something about to be deleted.
+        level_up = xp_engine.award(guild_id, message.author.id, config.leveling_rules, context=message)
+        if level_up is not None:
+            self._queue_level_up(level_up, config.leveling_rules, message)
+        if (message.content or "").strip().startswith(await prefix_store.get_prefix(guild_id)):
+            self.pipeline.submit(guild_id, Priority.COMMAND, "command", self._handle_prefix_command, message)
+
+    async def _welcome(self, member: discord.Member) -> None:
+        welcome = (await self.guild_config(member.guild.id)).welcome
+        if not welcome.get("enabled"):
+            return
+        channel = self._resolve_channel(member.guild, welcome.get("channel", ""))
+        if channel:
+            content = self._format_template(welcome.get("message", ""), member)
+            await channel.send(content)
+        if welcome.get("dmOnJoin"):
+            try:
+                await member.send(self._format_template(welcome.get("message", ""), member))
+            except discord.Forbidden:
+                logging.warning("Missing permissions to DM member on join")
+        await self._log_action("join", f"{member.display_name} joined", server=member.guild.name, user=str(member))
+
+    async def _farewell(self, member: discord.Member) -> None:
+        leave = (await self.guild_config(member.guild.id)).leave
+        if not leave.get("enabled"):
+            return
+        channel = self._resolve_channel(member.guild, leave.get("channel", ""))
+        if channel:
+            content = self._format_template(leave.get("message", ""), member)
+            await channel.send(content)
+        await self._log_action("leave", f"{member.display_name} left", server=member.guild.name, user=str(member))
+
+    def _queue_level_up(self, level_up: LevelUp, rules: LevelingRules, message: discord.Message) -> None:
+        # The XP is already spent, so role rewards are never shed; only the
+        # announcement is optional under load.
+        guild_id = level_up.guild_id
+        self.pipeline.submit(guild_id, Priority.MODERATION, "level_rewards", self._grant_level_rewards, message, level_up)
+        self.pipeline.submit(guild_id, Priority.COSMETIC, "level_up", self._announce_level_up, message, level_up, rules)
+
+    @observe_operation("level_rewards")
+    async def _grant_level_rewards(self, message: discord.Message, level_up: LevelUp) -> None:
+        member = message.author
+        roles = [role for role in (self._resolve_role(message.guild, r) for r in level_up.rewards) if role is not None]
+        if roles and isinstance(member, discord.Member):
+            try:
+                await member.add_roles(*roles, reason=f"Reached level {level_up.new_level}")
+            except discord.Forbidden:
+                logging.warning("Missing permissions to grant level rewards")
+            except discord.HTTPException:
+                logging.exception("Failed to grant level rewards")
+        await self._log_action(
+            "level_up",
+            f"{member.display_name} reached level {level_up.new_level}",
+            server=message.guild.name,
+            user=str(member),
+        )
+
+    @observe_operation("level_up")
+    async def _announce_level_up(self, message: discord.Message, level_up: LevelUp, rules: LevelingRules) -> None:
+        member = message.author
+        channel = self._resolve_channel(message.guild, rules.level_up_channel) or message.channel
+        try:
+            await channel.send(f"{member.mention} reached level {level_up.new_level}!")
+        except discord.Forbidden:
+            logging.warning("Missing permissions to announce level up")
+        except discord.HTTPException:
+            logging.exception("Failed to announce level up")
+
     def _format_template(self, template: str, member: discord.Member) -> str:
         return template.replace("{user}", member.display_name).replace("{server}", member.guild.name)
 
-    def _violates_automod(self, message: discord.Message, automod: dict) -> str | None:
+    def _violates_automod(self, message: discord.Message, rules: AutomodRules) -> str | None:
         content = message.content or ""
         lowered = content.lower()
-        if automod.get("linkFilter") and ("http://" in lowered or "https://" in lowered or "www." in lowered):
+        if rules.link_filter and ("http://" in lowered or "https://" in lowered or "www." in lowered):
             return "Link filter"
 
-        word_blacklist = [w.lower() for w in automod.get("wordBlacklist", []) if isinstance(w, str)]
-        if word_blacklist and any(word in lowered for word in word_blacklist):
+        if rules.word_blacklist and any(word in lowered for word in rules.word_blacklist):
             return "Blacklisted word"
 
-        max_mentions = int(automod.get("maxMentions", 0) or 0)
         mention_count = len(message.mentions) + len(message.role_mentions)
-        if max_mentions >= 0 and mention_count > max_mentions:
+        if rules.max_mentions >= 0 and mention_count > rules.max_mentions:
             return "Too many mentions"
 
-        if automod.get("capsFilter"):
+        if rules.caps_filter:
             letters = [c for c in content if c.isalpha()]
             if len(letters) >= 10:
                 ratio = sum(1 for c in letters if c.isupper()) / len(letters)
                 if ratio > 0.7:
                     return "Excessive caps"
 
-        max_emojis = int(automod.get("maxEmojis", 0) or 0)
-        if max_emojis > 0:
+        if rules.max_emojis > 0:
             emoji_count = self._count_emojis(content)
-            if emoji_count > max_emojis:
+            if emoji_count > rules.max_emojis:
                 return "Too many emojis"
 
         return None
@@ -270,16 +378,22 @@ class DiscordBotManager:
         unicode_emojis = len(re.findall(r"[\U0001F300-\U0001FAFF]", content))
         return custom + unicode_emojis
 
-    async def _log_action(self, action: str, details: str, server: str = "") -> None:
+    @observe_operation("log_action")
+    async def _log_action(self, action: str, details: str, server: str = "", user: str = "bot") -> None:
+        # Millisecond ids, bumped past the last one handed out so entries
+        # written in the same millisecond don't collide.
+        entry_id = max(int(datetime.now(timezone.utc).timestamp() * 1000), self._last_log_id + 1)
+        self._last_log_id = entry_id
+
         def _write() -> None:
             session = SessionLocal()
             try:
                 now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
                 entry = LogEntryModel(
-                    id=int(datetime.now(timezone.utc).timestamp() * 1000),
+                    id=entry_id,
                     timestamp=now,
                     server=server,
-                    user="bot",
+                    user=user,
                     action=action,
                     details=details,
                     level="info",
@@ -302,18 +416,25 @@ class DiscordBotManager:
         finally:
             session.close()
 
+    @observe_operation("prefix_command")
     async def _handle_prefix_command(self, message: discord.Message) -> None:
         content = (message.content or "").strip()
         if not content:
             return
-        prefix = await asyncio.to_thread(self._load_prefix_sync, message.guild.id)
+        prefix = await prefix_store.get_prefix(message.guild.id)
         if not content.startswith(prefix):
             return
         parts = content[len(prefix):].strip().split()
         if not parts:
             return
         command_name = parts[0].lower()
-        response = await asyncio.to_thread(self._load_command_response_sync, command_name)
+        command = (await command_store.get_catalog()).get(command_name)
+        if command is None or not command.enabled:
+            return
+        response = command.response
+        if response and self._cooldown_remaining(command, message.author.id, message.channel.id):
+            COMMANDS_THROTTLED.labels(command_name).inc()
+            return
         if response:
             try:
                 await message.channel.send(response)
@@ -321,26 +442,45 @@ class DiscordBotManager:
                 logging.warning("Missing permissions to send command response")
             except discord.HTTPException:
                 logging.exception("Failed to send command response")
+            activity_tracker.record_command(message.guild.id, message.author.id, str(message.author), command_name)
             await asyncio.to_thread(self._increment_command_usage_sync, command_name)
-            await self._log_action("command", command_name, server=message.guild.name)
-
-    def _load_prefix_sync(self, guild_id: int) -> str:
-        session = SessionLocal()
-        try:
-            row = session.query(ServerSettingsModel).filter(ServerSettingsModel.guild_id == guild_id).first()
-            return row.prefix if row and row.prefix else "!"
-        finally:
-            session.close()
-
-    def _load_command_response_sync(self, name: str) -> str | None:
-        session = SessionLocal()
+            await self._log_action("command", command_name, server=message.guild.name, user=str(message.author))
+
+    def _cooldown_remaining(self, command: CommandSpec, user_id: int, channel_id: int | None) -> float:
+        if command.cooldown <= 0:
+            return 0.0
+        if settings.command_cooldown_per_channel:
+            key = (command.name, user_id, channel_id)
+        else:
+            key = (command.name, user_id)
+        return self.cooldowns.hit(key, command.cooldown)
+
+    @observe_operation("app_command")
+    async def _handle_app_command(self, interaction: discord.Interaction, command_name: str) -> None:
+        command = (await command_store.get_catalog()).get(command_name)
+        if command is None or not command.enabled or not command.response:
+            await interaction.response.send_message("This command is not available.", ephemeral=True)
+            return
+        remaining = self._cooldown_remaining(command, interaction.user.id, interaction.channel_id)
+        if remaining:
+            COMMANDS_THROTTLED.labels(command_name).inc()
+            await interaction.response.send_message(f"Slow down! Try again in {remaining:.0f}s.", ephemeral=True)
+            return
         try:
-            row = session.query(CommandModel).filter(CommandModel.name == name).first()
-            if row is None or not row.enabled:
-                return None
-            return row.description or None
-        finally:
-            session.close()
+            await interaction.response.send_message(command.response)
+        except discord.HTTPException:
+            logging.exception("Failed to respond to application command")
+            return
+        if interaction.guild_id is not None:
+            activity_tracker.record_command(interaction.guild_id, interaction.user.id, str(interaction.user), command_name)
+            active_users.record(interaction.guild_id, interaction.user.id)
+        await asyncio.to_thread(self._increment_command_usage_sync, command_name)
+        await self._log_action(
+            "command",
+            command_name,
+            server=interaction.guild.name if interaction.guild else "",
+            user=str(interaction.user),
+        )
 
 
 bot_manager = DiscordBotManager()
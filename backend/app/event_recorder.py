@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import time
+from typing import Awaitable, Callable, Iterator
+
+from .commands import command_store, prefix_store
+from .config import settings
+from .guild_settings import AutomodRules
+from .metrics import REGISTRY
+
+
+EVENTS_RECORDED = REGISTRY.counter("gateway_events_recorded_total", "Gateway events written to the recording.", ("event",))
+EVENTS_DROPPED = REGISTRY.counter("gateway_events_dropped_total", "Gateway events dropped because the recording buffer was full.")
+
+RECORDING_VERSION = 1
+LINK_MARKERS = ("https://", "http://", "www.")
+_TOKENS = re.compile(r"(\s+)")
+
+
+def mask(text: str) -> str:
+    # Keeps the shape automod looks at (length, case, spacing, punctuation,
+    # emoji and <:name:id> markup) and nothing readable.
+    return "".join("X" if c.isupper() else "x" if c.isalpha() else "0" if c.isdigit() else c for c in text)
+
+
+def anonymize_content(content: str, prefix: str, commands: set[str], blacklist: tuple[str, ...]) -> tuple[str, str | None]:
+    # Returns the masked text and, if it invoked a known command, its name.
+    # Command tokens, blacklisted words and link markers survive so replays
+    # take the same automod and command branches as the original message.
+    parts = _TOKENS.split(content)
+    command = None
+    for index, token in enumerate(parts):
+        if not token or token.isspace():
+            continue
+        lowered = token.lower()
+        if command is None and index == 0 and prefix and token.startswith(prefix) and lowered[len(prefix):] in commands:
+            command = lowered[len(prefix):]
+            continue
+        parts[index] = _mask_except(token, lowered, (*blacklist, *LINK_MARKERS))
+    return "".join(parts), command
+
+
+def _mask_except(token: str, lowered: str, needles: tuple[str, ...]) -> str:
+    # Keeps every occurrence of a needle verbatim and masks everything else,
+    # so "password1" with "ass" blacklisted records as "xassxxxx0".
+    if len(lowered) != len(token):
+        # A few characters lowercase to two; keep offsets aligned with token.
+        lowered = "".join(c.lower()[:1] for c in token)
+    keep = [False] * len(token)
+    for needle in needles:
+        if not needle:
+            continue
+        at = lowered.find(needle)
+        while at >= 0:
+            keep[at:at + len(needle)] = [True] * len(needle)
+            at = lowered.find(needle, at + 1)
+    return "".join(c if kept else mask(c) for c, kept in zip(token, keep))
+
+
+class EventRecorder:
+    # Append-only JSON lines, one event per line with short keys. Handlers
+    # only append to an in-memory buffer; a background task writes it out.
+    def __init__(self, path: str | None, salt: str = "", max_buffer: int = 50_000) -> None:
+        self.path = Path(path) if path else None
+        self.max_buffer = max_buffer
+        self._key = salt.encode() if salt else os.urandom(16)
+        self._buffer: list[str] = []
+        self._automod_for: Callable[[int], AutomodRules | None] = lambda _guild_id: None
+        self._flush_lock = asyncio.Lock()
+        self._capture = {
+            "on_message": self._message,
+            "on_member_join": self._member,
+            "on_member_remove": self._member,
+            "on_guild_join": self._guild,
+            "on_guild_remove": self._guild,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def set_automod_source(self, automod_for: Callable[[int], AutomodRules | None]) -> None:
+        self._automod_for = automod_for
+
+    def pseudonym(self, value: int) -> int:
+        # Keyed, so ids can't be recovered by hashing known snowflakes; 48
+        # bits keeps lines short with negligible collisions.
+        digest = hashlib.blake2b(value.to_bytes(8, "big"), key=self._key, digest_size=6).digest()
+        return int.from_bytes(digest, "big")
+
+    def wrap(self, name: str, handler: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+        capture = self._capture.get(name)
+        if capture is None:
+            return handler
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs) -> None:
+            try:
+                record = capture(*args)
+            except Exception:
+                logging.exception("Failed to record %s", name)
+                record = None
+            if record is not None:
+                self._append(name[3:], record)
+            await handler(*args, **kwargs)
+
+        return wrapper
+
+    def _append(self, event: str, record: dict) -> None:
+        if len(self._buffer) >= self.max_buffer:
+            EVENTS_DROPPED.inc()
+            return
+        record = {"t": int(time.time() * 1000), "e": event, **record}
+        self._buffer.append(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        EVENTS_RECORDED.labels(event).inc()
+
+    def _message(self, message) -> dict | None:
+        if message.guild is None:
+            return None
+        guild_id = message.guild.id
+        automod = self._automod_for(guild_id)
+        catalog = command_store.peek()
+        content, command = anonymize_content(
+            message.content or "",
+            prefix_store.peek(guild_id),
+            {name for name, spec in catalog.commands.items() if spec.enabled},
+            automod.word_blacklist if automod else (),
+        )
+        record = {
+            "g": self.pseudonym(guild_id),
+            "c": self.pseudonym(message.channel.id),
+            "u": self.pseudonym(message.author.id),
+            "x": content,
+        }
+        if message.author.bot:
+            record["b"] = 1
+        if message.mentions:
+            record["m"] = [self.pseudonym(user.id) for user in message.mentions]
+        if message.role_mentions:
+            record["r"] = len(message.role_mentions)
+        if command is not None:
+            record["p"] = prefix_store.peek(guild_id)
+            record["k"] = command
+        return record
+
+    def _member(self, member) -> dict:
+        return {"g": self.pseudonym(member.guild.id), "u": self.pseudonym(member.id)}
+
+    def _guild(self, guild) -> dict:
+        return {"g": self.pseudonym(guild.id)}
+
+    def _write_sync(self, lines: list[str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new = not self.path.exists() or self.path.stat().st_size == 0
+        with self.path.open("a", encoding="utf-8") as fh:
+            if new:
+                fh.write(json.dumps({"v": RECORDING_VERSION, "created": int(time.time() * 1000)}) + "\n")
+            fh.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            lines, self._buffer = self._buffer, []
+            if lines:
+                await asyncio.to_thread(self._write_sync, lines)
+            return len(lines)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to write gateway event recording")
+
+
+def read_recording(path: str | Path) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "e" in record:
+                yield record
+
+
+event_recorder = EventRecorder(
+    settings.event_recording_path,
+    salt=settings.event_recording_salt,
+    max_buffer=settings.event_recording_buffer,
+)
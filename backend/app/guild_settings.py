@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import time
+
+from .database import SessionLocal
+from .models import GuildSettingsOverrideModel
+
+
+OVERRIDABLE_SECTIONS = ("automod", "welcome", "leave", "leveling")
+
+
+@dataclass(frozen=True)
+class AutomodRules:
+    link_filter: bool = False
+    caps_filter: bool = False
+    word_blacklist: tuple[str, ...] = ()
+    max_mentions: int = 0
+    max_emojis: int = 0
+
+    @classmethod
+    def compile(cls, automod: dict) -> "AutomodRules":
+        return cls(
+            link_filter=bool(automod.get("linkFilter")),
+            caps_filter=bool(automod.get("capsFilter")),
+            word_blacklist=tuple(w.lower() for w in automod.get("wordBlacklist", []) if isinstance(w, str) and w),
+            max_mentions=int(automod.get("maxMentions", 0) or 0),
+            max_emojis=int(automod.get("maxEmojis", 0) or 0),
+        )
+
+
+@dataclass(frozen=True)
+class LevelingRules:
+    enabled: bool = False
+    xp_per_message: int = 0
+    cooldown: float = 0.0
+    level_up_channel: str = ""
+    # (level, role) pairs sorted by level; role is an id or a name.
+    role_rewards: tuple[tuple[int, str], ...] = ()
+
+    @classmethod
+    def compile(cls, leveling: dict) -> "LevelingRules":
+        rewards = []
+        for reward in leveling.get("roleRewards", []) or []:
+            if not isinstance(reward, dict):
+                continue
+            try:
+                level = int(reward.get("level"))
+            except (TypeError, ValueError):
+                continue
+            role = str(reward.get("role") or "").strip()
+            if role:
+                rewards.append((level, role))
+        return cls(
+            enabled=bool(leveling.get("enabled")),
+            xp_per_message=max(0, int(leveling.get("xpPerMessage", 0) or 0)),
+            cooldown=max(0.0, float(leveling.get("xpCooldown", 0) or 0)),
+            level_up_channel=str(leveling.get("levelUpChannel") or ""),
+            role_rewards=tuple(sorted(rewards)),
+        )
+
+    def rewards_between(self, old_level: int, new_level: int) -> list[str]:
+        return [role for level, role in self.role_rewards if old_level < level <= new_level]
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    guild_id: int | None
+    automod: AutomodRules
+    welcome: dict
+    leave: dict
+    leveling: dict
+    leveling_rules: LevelingRules
+    raw: dict = field(repr=False)
+
+
+def merge_sections(defaults: dict, overrides: dict | None) -> dict:
+    merged = dict(defaults)
+    for section in OVERRIDABLE_SECTIONS:
+        if overrides and overrides.get(section):
+            merged[section] = {**defaults.get(section, {}), **overrides[section]}
+    return merged
+
+
+def compile_config(guild_id: int | None, merged: dict) -> GuildConfig:
+    return GuildConfig(
+        guild_id=guild_id,
+        automod=AutomodRules.compile(merged.get("automod", {})),
+        welcome=dict(merged.get("welcome", {})),
+        leave=dict(merged.get("leave", {})),
+        leveling=dict(merged.get("leveling", {})),
+        leveling_rules=LevelingRules.compile(merged.get("leveling", {})),
+        raw=merged,
+    )
+
+
+def load_overrides_sync(guild_id: int) -> dict | None:
+    session = SessionLocal()
+    try:
+        row = session.get(GuildSettingsOverrideModel, guild_id)
+        if row is None:
+            return None
+        return {section: getattr(row, section) or {} for section in OVERRIDABLE_SECTIONS}
+    finally:
+        session.close()
+
+
+class GuildConfigCache:
+    # Only touched from the event loop thread, so plain dict reads are safe
+    # without a lock; loads run in a worker thread and are deduplicated.
+    def __init__(self, defaults: dict, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._defaults = defaults
+        self._default_config = compile_config(None, defaults)
+        self._entries: OrderedDict[int, tuple[float, GuildConfig]] = OrderedDict()
+        self._loading: dict[int, asyncio.Future[GuildConfig]] = {}
+        self._generation = 0
+
+    @property
+    def defaults(self) -> dict:
+        return self._defaults
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_defaults(self, defaults: dict) -> None:
+        if defaults == self._defaults:
+            return
+        self._defaults = defaults
+        self._default_config = compile_config(None, defaults)
+        self.clear()
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def invalidate(self, guild_id: int) -> None:
+        self._generation += 1
+        self._entries.pop(guild_id, None)
+
+    def peek(self, guild_id: int) -> GuildConfig | None:
+        entry = self._entries.get(guild_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        self._entries.move_to_end(guild_id)
+        return entry[1]
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        config = self.peek(guild_id)
+        if config is not None:
+            return config
+        pending = self._loading.get(guild_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[guild_id] = future
+        generation = self._generation
+        try:
+            overrides = await asyncio.to_thread(load_overrides_sync, guild_id)
+            if overrides is None:
+                config = self._default_config
+            else:
+                config = compile_config(guild_id, merge_sections(self._defaults, overrides))
+            # An invalidation raced the load; serve it once but don't cache it.
+            if generation == self._generation:
+                self._store(guild_id, config)
+            future.set_result(config)
+            return config
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved so a lone loader doesn't warn.
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._loading.pop(guild_id, None)
+
+    def _store(self, guild_id: int, config: GuildConfig) -> None:
+        self._entries[guild_id] = (time.monotonic() + self.ttl, config)
+        self._entries.move_to_end(guild_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Hashable, Iterable
+
+from .config import settings
+from .metrics import REGISTRY
+
+
+TRACKED_GUILDS = REGISTRY.gauge("heavy_hitter_guilds", "Guilds with live heavy-hitter summaries.")
+
+
+@dataclass(frozen=True)
+class HeavyHitter:
+    key: Hashable
+    label: str
+    count: int
+    # Upper bound on how much of count may belong to keys it evicted.
+    error: int
+
+
+class SpaceSaving:
+    # Metwally et al.'s Space-Saving with the stream-summary layout: keys are
+    # grouped into buckets of equal count so the minimum (the eviction
+    # victim) is found in O(1). At most `capacity` keys are kept; any key
+    # with true frequency above total/capacity is guaranteed to be present.
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self._counts: dict[Hashable, int] = {}
+        self._errors: dict[Hashable, int] = {}
+        self._labels: dict[Hashable, str] = {}
+        self._buckets: dict[int, dict[Hashable, None]] = {}
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @property
+    def floor(self) -> int:
+        # The most times any untracked key can have been seen.
+        return self._min if len(self._counts) >= self.capacity else 0
+
+    def add(self, key: Hashable, label: str | None = None) -> None:
+        self.total += 1
+        count = self._counts.get(key)
+        if count is not None:
+            self._unbucket(key, count)
+        elif len(self._counts) < self.capacity:
+            count = 0
+            self._errors[key] = 0
+        else:
+            count = self._min
+            victim = next(iter(self._buckets[count]))
+            self._unbucket(victim, count)
+            del self._counts[victim], self._errors[victim]
+            self._labels.pop(victim, None)
+            self._errors[key] = count
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, {})[key] = None
+        if count == 0:
+            self._min = 1
+        if label is not None:
+            self._labels[key] = label
+
+    def _unbucket(self, key: Hashable, count: int) -> None:
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if count == self._min:
+                self._min = count + 1
+
+    def entries(self) -> Iterable[tuple[Hashable, int, int, str | None]]:
+        for key, count in self._counts.items():
+            yield key, count, self._errors[key], self._labels.get(key)
+
+    def top(self, k: int) -> list[HeavyHitter]:
+        return merge_top([self], k)
+
+
+def merge_top(summaries: list[SpaceSaving], k: int) -> list[HeavyHitter]:
+    # A key missing from a full summary may still have been seen up to that
+    # summary's floor times, so that much is added to both count and error.
+    counts: dict[Hashable, int] = {}
+    errors: dict[Hashable, int] = {}
+    labels: dict[Hashable, str] = {}
+    total_floor = 0
+    for summary in summaries:
+        floor = summary.floor
+        total_floor += floor
+        for key, count, error, label in summary.entries():
+            # Credit this summary's floor up front; whatever is left of
+            # total_floor afterwards comes from summaries lacking the key.
+            counts[key] = counts.get(key, 0) + count - floor
+            errors[key] = errors.get(key, 0) + error - floor
+            if label is not None:
+                labels[key] = label
+    for key in counts:
+        counts[key] += total_floor
+        errors[key] += total_floor
+    ranked = sorted(counts, key=lambda key: (-counts[key], errors[key]))[:k]
+    return [HeavyHitter(key, labels.get(key, str(key)), counts[key], errors[key]) for key in ranked]
+
+
+class WindowedTopK:
+    # Tumbling windows, one summary each; a range query merges the windows it
+    # overlaps, so answers are window-aligned at the old end of the range.
+    def __init__(self, capacity: int, window_seconds: float, windows: int) -> None:
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._summaries: dict[int, SpaceSaving] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._summaries)
+
+    def add(self, key: Hashable, label: str | None, now: float) -> None:
+        index = int(now // self.window_seconds)
+        summary = self._summaries.get(index)
+        if summary is None:
+            summary = self._summaries[index] = SpaceSaving(self.capacity)
+            self.expire(now)
+        summary.add(key, label)
+
+    def expire(self, now: float) -> None:
+        oldest = int(now // self.window_seconds) - self.windows + 1
+        for index in [index for index in self._summaries if index < oldest]:
+            del self._summaries[index]
+
+    def top(self, k: int, since: float | None, now: float) -> list[HeavyHitter]:
+        oldest = int(now // self.window_seconds) - self.windows + 1
+        if since is not None:
+            oldest = max(oldest, int(since // self.window_seconds))
+        return merge_top([summary for index, summary in self._summaries.items() if index >= oldest], k)
+
+
+STREAMS = ("commands", "command_users", "chatters")
+
+
+class ActivityTracker:
+    # Per guild and across all guilds: which commands run most, who runs
+    # them, and who talks most. Memory is bounded by guilds x windows x
+    # capacity no matter how much traffic arrives.
+    def __init__(self, capacity: int, global_capacity: int, window_seconds: float, windows: int) -> None:
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._guilds: dict[int, dict[str, WindowedTopK]] = {}
+        self._global = {stream: WindowedTopK(global_capacity, window_seconds, windows) for stream in STREAMS}
+        self._window: int | None = None
+
+    def _streams(self, guild_id: int, now: float) -> dict[str, WindowedTopK]:
+        window = int(now // self.window_seconds)
+        if window != self._window:
+            self._window = window
+            self._sweep(now)
+        streams = self._guilds.get(guild_id)
+        if streams is None:
+            streams = self._guilds[guild_id] = {
+                stream: WindowedTopK(self.capacity, self.window_seconds, self.windows) for stream in STREAMS
+            }
+            TRACKED_GUILDS.set(len(self._guilds))
+        return streams
+
+    def _sweep(self, now: float) -> None:
+        for guild_id, streams in list(self._guilds.items()):
+            for tracker in streams.values():
+                tracker.expire(now)
+            if not any(streams.values()):
+                del self._guilds[guild_id]
+        for tracker in self._global.values():
+            tracker.expire(now)
+        TRACKED_GUILDS.set(len(self._guilds))
+
+    def record_message(self, guild_id: int, user_id: int, user_name: str, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        self._streams(guild_id, now)["chatters"].add(user_id, user_name, now)
+        self._global["chatters"].add(user_id, user_name, now)
+
+    def record_command(self, guild_id: int, user_id: int, user_name: str, command: str, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        streams = self._streams(guild_id, now)
+        streams["commands"].add(command, command, now)
+        streams["command_users"].add(user_id, user_name, now)
+        self._global["commands"].add(command, command, now)
+        self._global["command_users"].add(user_id, user_name, now)
+
+    def top(
+        self, stream: str, k: int, since: float | None = None, guild_id: int | None = None, now: float | None = None
+    ) -> list[HeavyHitter]:
+        now = time.time() if now is None else now
+        if guild_id is None:
+            return self._global[stream].top(k, since, now)
+        streams = self._guilds.get(guild_id)
+        return streams[stream].top(k, since, now) if streams else []
+
+
+activity_tracker = ActivityTracker(
+    capacity=settings.heavy_hitters_capacity,
+    global_capacity=settings.heavy_hitters_global_capacity,
+    window_seconds=settings.heavy_hitters_window_seconds,
+    windows=settings.heavy_hitters_windows,
+)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import time
+from typing import Iterable
+
+from sqlalchemy import update
+
+from .config import settings
+from .database import SessionLocal
+from .models import AiIntentModel, AiIntentStateModel
+
+
+SYSTEM_PROMPT_HEADER = (
+    "You are a helpful assistant for a Discord bot control panel. "
+    "Use the intent templates as guidance for concise replies. "
+    "Return only the response text."
+)
+
+
+@dataclass(frozen=True)
+class IntentRecord:
+    id: str
+    label: str
+    enabled: bool
+    response: str
+
+
+@dataclass
+class IntentSnapshot:
+    version: int
+    intents: tuple[IntentRecord, ...]
+    by_id: dict[str, IntentRecord] = field(init=False)
+    default: IntentRecord | None = field(init=False)
+    _context: str = field(init=False)
+    _prompts: dict[str | None, str] = field(init=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.by_id = {intent.id: intent for intent in self.intents}
+        enabled = [intent for intent in self.intents if intent.enabled]
+        self.default = enabled[0] if enabled else (self.intents[0] if self.intents else None)
+        if enabled:
+            lines = ["Enabled intents:"]
+            lines.extend(f"- {intent.label}: {intent.response}" for intent in enabled)
+            self._context = "\n".join(lines)
+        else:
+            self._context = "No predefined intents are enabled."
+
+    def pick(self, intent_id: str | None) -> IntentRecord | None:
+        if intent_id:
+            return self.by_id.get(intent_id)
+        return self.default
+
+    def system_prompt(self, intent_id: str | None) -> str:
+        # Snapshots are immutable, so each (version, preferred intent) prompt
+        # is rendered at most once per worker.
+        chosen = self.pick(intent_id)
+        key = chosen.id if chosen else None
+        cached = self._prompts.get(key)
+        if cached is not None:
+            return cached
+        preferred = f"\nPreferred intent: {chosen.label}. Template: {chosen.response}" if chosen else ""
+        prompt = f"{SYSTEM_PROMPT_HEADER}\n{self._context}{preferred}"
+        self._prompts[key] = prompt
+        return prompt
+
+
+EMPTY_SNAPSHOT = IntentSnapshot(version=0, intents=())
+
+
+class IntentStore:
+    def __init__(self, refresh_interval: float | None = None) -> None:
+        self._snapshot = EMPTY_SNAPSHOT
+        self._checked_at = float("-inf")
+        self._refresh_interval = (
+            settings.ai_intent_refresh_seconds if refresh_interval is None else refresh_interval
+        )
+        self._refresh_lock = asyncio.Lock()
+
+    async def get_snapshot(self) -> IntentSnapshot:
+        if time.monotonic() - self._checked_at < self._refresh_interval:
+            return self._snapshot
+        async with self._refresh_lock:
+            if time.monotonic() - self._checked_at < self._refresh_interval:
+                return self._snapshot
+            version = await asyncio.to_thread(self._load_version_sync)
+            if version != self._snapshot.version:
+                self._snapshot = await asyncio.to_thread(self._load_snapshot_sync)
+            self._checked_at = time.monotonic()
+        return self._snapshot
+
+    async def save(self, intents: Iterable[IntentRecord]) -> IntentSnapshot:
+        unique: dict[str, IntentRecord] = {}
+        for intent in intents:
+            unique.setdefault(intent.id, intent)
+        records = tuple(unique.values())
+        async with self._refresh_lock:
+            version = await asyncio.to_thread(self._save_sync, records)
+            self._snapshot = IntentSnapshot(version=version, intents=records)
+            self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def _load_version_sync(self) -> int:
+        session = SessionLocal()
+        try:
+            state = session.get(AiIntentStateModel, 1)
+            return state.version if state else 0
+        finally:
+            session.close()
+
+    def _load_snapshot_sync(self) -> IntentSnapshot:
+        session = SessionLocal()
+        try:
+            state = session.get(AiIntentStateModel, 1)
+            rows = session.query(AiIntentModel).order_by(AiIntentModel.position).all()
+            intents = tuple(
+                IntentRecord(id=row.id, label=row.label, enabled=row.enabled, response=row.response)
+                for row in rows
+            )
+            return IntentSnapshot(version=state.version if state else 0, intents=intents)
+        finally:
+            session.close()
+
+    def _save_sync(self, intents: tuple[IntentRecord, ...]) -> int:
+        session = SessionLocal()
+        try:
+            state = session.get(AiIntentStateModel, 1, with_for_update=True)
+            if state is None:
+                state = AiIntentStateModel(id=1, version=0)
+                session.add(state)
+                session.flush()
+            session.query(AiIntentModel).delete(synchronize_session=False)
+            for position, intent in enumerate(intents):
+                session.add(
+                    AiIntentModel(
+                        id=intent.id,
+                        position=position,
+                        label=intent.label,
+                        enabled=intent.enabled,
+                        response=intent.response,
+                    )
+                )
+            session.execute(
+                update(AiIntentStateModel)
+                .where(AiIntentStateModel.id == 1)
+                .values(version=AiIntentStateModel.version + 1)
+            )
+            session.commit()
+            session.refresh(state)
+            return state.version
+        finally:
+            session.close()
+
+
+intent_store = IntentStore()
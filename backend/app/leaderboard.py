@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Iterable, Iterator
+
+from sqlalchemy import select
+
+from .database import SessionLocal
+from .metrics import REGISTRY
+from .models import MemberXpModel
+
+
+LEADERBOARD_REBUILD_SECONDS = REGISTRY.gauge("leaderboard_rebuild_seconds", "Duration of the last leaderboard rebuild.")
+LEADERBOARD_MEMBERS = REGISTRY.gauge("leaderboard_members", "Members tracked across all guild leaderboards.")
+
+MAX_HEIGHT = 24
+_P = 0.25
+
+
+class _Node:
+    __slots__ = ("key", "member", "score", "forward", "width")
+
+    def __init__(self, key: tuple[int, int], member: int, score: int, height: int) -> None:
+        self.key = key
+        self.member = member
+        self.score = score
+        self.forward: list[_Node | None] = [None] * height
+        # width[i] = how many level-0 steps forward[i] skips.
+        self.width: list[int] = [1] * height
+
+
+class RankedIndex:
+    # Indexable skip list ordered by (-score, member): every operation,
+    # including rank lookups and positional slices, is O(log n) expected.
+    def __init__(self, seed: int | None = None) -> None:
+        self._head = _Node((0, 0), 0, 0, MAX_HEIGHT)
+        self._height = 1
+        self._scores: dict[int, int] = {}
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, member: int) -> bool:
+        return member in self._scores
+
+    def score(self, member: int) -> int | None:
+        return self._scores.get(member)
+
+    def _random_height(self) -> int:
+        height = 1
+        while height < MAX_HEIGHT and self._random.random() < _P:
+            height += 1
+        return height
+
+    def _find(self, key: tuple[int, int]) -> tuple[list[_Node], list[int]]:
+        update: list[_Node] = [self._head] * MAX_HEIGHT
+        rank = [0] * MAX_HEIGHT
+        node = self._head
+        position = 0
+        for level in range(self._height - 1, -1, -1):
+            nxt = node.forward[level]
+            while nxt is not None and nxt.key < key:
+                position += node.width[level]
+                node = nxt
+                nxt = node.forward[level]
+            update[level] = node
+            rank[level] = position
+        return update, rank
+
+    def _insert(self, member: int, score: int) -> None:
+        key = (-score, member)
+        update, rank = self._find(key)
+        height = self._random_height()
+        if height > self._height:
+            for level in range(self._height, height):
+                update[level] = self._head
+                rank[level] = 0
+                self._head.width[level] = len(self._scores) + 1
+            self._height = height
+        node = _Node(key, member, score, height)
+        position = rank[0]
+        for level in range(height):
+            prev = update[level]
+            node.forward[level] = prev.forward[level]
+            prev.forward[level] = node
+            skipped = position - rank[level]
+            node.width[level] = prev.width[level] - skipped
+            prev.width[level] = skipped + 1
+        for level in range(height, self._height):
+            update[level].width[level] += 1
+        self._scores[member] = score
+
+    def _delete(self, member: int, score: int) -> None:
+        key = (-score, member)
+        update, _ = self._find(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return
+        for level in range(self._height):
+            prev = update[level]
+            if prev.forward[level] is node:
+                prev.width[level] += node.width[level] - 1
+                prev.forward[level] = node.forward[level]
+            else:
+                prev.width[level] -= 1
+        while self._height > 1 and self._head.forward[self._height - 1] is None:
+            self._height -= 1
+        del self._scores[member]
+
+    def load(self, scores: Iterable[tuple[int, int]]) -> None:
+        # Bulk build in O(n log n) for the sort plus O(n) linking, instead of
+        # n individual inserts.
+        entries = sorted(((-score, member), member, score) for member, score in scores)
+        self._head = _Node((0, 0), 0, 0, MAX_HEIGHT)
+        self._scores = {}
+        last = [self._head] * MAX_HEIGHT
+        last_position = [0] * MAX_HEIGHT
+        height = 1
+        for position, (key, member, score) in enumerate(entries, 1):
+            node_height = self._random_height()
+            height = max(height, node_height)
+            node = _Node(key, member, score, node_height)
+            for level in range(node_height):
+                last[level].forward[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+            self._scores[member] = score
+        for level in range(MAX_HEIGHT):
+            last[level].width[level] = len(entries) + 1 - last_position[level]
+        self._height = height
+
+    def set(self, member: int, score: int) -> None:
+        current = self._scores.get(member)
+        if current == score:
+            return
+        if current is not None:
+            self._delete(member, current)
+        self._insert(member, score)
+
+    def add(self, member: int, delta: int) -> int:
+        score = self._scores.get(member, 0) + delta
+        self.set(member, score)
+        return score
+
+    def remove(self, member: int) -> None:
+        current = self._scores.get(member)
+        if current is not None:
+            self._delete(member, current)
+
+    def rank(self, member: int) -> int | None:
+        # 0-based position; ties are broken by member id.
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        _, rank = self._find((-score, member))
+        return rank[0]
+
+    def _node_at(self, index: int) -> _Node | None:
+        if index < 0 or index >= len(self._scores):
+            return None
+        node = self._head
+        remaining = index + 1
+        for level in range(self._height - 1, -1, -1):
+            while node.forward[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.forward[level]
+            if remaining == 0:
+                return node
+        return node
+
+    def slice(self, start: int, count: int) -> list[tuple[int, int, int]]:
+        # (rank, member, score) for positions [start, start + count).
+        start = max(0, start)
+        node = self._node_at(start)
+        out = []
+        position = start
+        while node is not None and len(out) < count:
+            out.append((position, node.member, node.score))
+            node = node.forward[0]
+            position += 1
+        return out
+
+    def top(self, count: int) -> list[tuple[int, int, int]]:
+        return self.slice(0, count)
+
+    def around(self, member: int, radius: int) -> list[tuple[int, int, int]]:
+        rank = self.rank(member)
+        if rank is None:
+            return []
+        start = max(0, rank - radius)
+        return self.slice(start, rank - start + radius + 1)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        node = self._head.forward[0]
+        while node is not None:
+            yield node.member, node.score
+            node = node.forward[0]
+
+
+def _build_indexes_sync() -> dict[int, RankedIndex]:
+    session = SessionLocal()
+    try:
+        scores: dict[int, list[tuple[int, int]]] = {}
+        rows = session.execute(select(MemberXpModel.guild_id, MemberXpModel.user_id, MemberXpModel.xp))
+        for guild_id, user_id, xp in rows:
+            scores.setdefault(guild_id, []).append((user_id, xp))
+    finally:
+        session.close()
+    indexes = {}
+    for guild_id, members in scores.items():
+        index = indexes[guild_id] = RankedIndex()
+        index.load(members)
+    return indexes
+
+
+class Leaderboards:
+    def __init__(self) -> None:
+        self._indexes: dict[int, RankedIndex] = {}
+        self._rebuilding = False
+        self._buffered: list[tuple[int, int, int]] = []
+        self.ready = False
+
+    def get(self, guild_id: int) -> RankedIndex | None:
+        return self._indexes.get(guild_id)
+
+    def add(self, guild_id: int, member: int, delta: int) -> None:
+        if self._rebuilding:
+            self._buffered.append((guild_id, member, delta))
+        index = self._indexes.get(guild_id)
+        if index is None:
+            index = self._indexes[guild_id] = RankedIndex()
+        index.add(member, delta)
+
+    def members(self) -> int:
+        return sum(len(index) for index in self._indexes.values())
+
+    async def rebuild(self) -> None:
+        self._rebuilding = True
+        self._buffered = []
+        started = time.perf_counter()
+        try:
+            indexes = await asyncio.to_thread(_build_indexes_sync)
+            # Awards that landed while the snapshot was being read.
+            for guild_id, member, delta in self._buffered:
+                indexes.setdefault(guild_id, RankedIndex()).add(member, delta)
+            self._indexes = indexes
+            self.ready = True
+        finally:
+            self._rebuilding = False
+            self._buffered = []
+        LEADERBOARD_REBUILD_SECONDS.set(time.perf_counter() - started)
+        LEADERBOARD_MEMBERS.set(self.members())
+
+
+leaderboards = Leaderboards()
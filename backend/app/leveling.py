@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Any, Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .config import settings
+from .database import SessionLocal, engine
+from .guild_settings import LevelingRules
+from .leaderboard import leaderboards
+from .metrics import REGISTRY
+from .models import MemberXpModel
+
+
+MAX_LEVEL = 1000
+
+
+def _build_thresholds(max_level: int) -> list[int]:
+    # Total XP needed to reach each level; going from L to L+1 costs
+    # 5L^2 + 50L + 100, the curve most Discord leveling bots use.
+    thresholds = [0]
+    for level in range(max_level):
+        thresholds.append(thresholds[-1] + 5 * level * level + 50 * level + 100)
+    return thresholds
+
+
+LEVEL_THRESHOLDS = _build_thresholds(MAX_LEVEL)
+
+XP_AWARDS = REGISTRY.counter("leveling_xp_awards_total", "Messages that earned XP.")
+XP_FLUSHED_ROWS = REGISTRY.counter("leveling_flushed_rows_total", "Member XP rows written by the write-behind flusher.")
+XP_DIRTY_MEMBERS = REGISTRY.gauge("leveling_dirty_members", "Members with XP not yet written to the database.")
+XP_LOADED_GUILDS = REGISTRY.gauge("leveling_loaded_guilds", "Guilds whose XP totals are held in memory.")
+
+
+def level_for_xp(xp: int) -> int:
+    return bisect_right(LEVEL_THRESHOLDS, xp) - 1
+
+
+def xp_for_level(level: int) -> int:
+    return LEVEL_THRESHOLDS[max(0, min(level, MAX_LEVEL))]
+
+
+@dataclass(frozen=True)
+class LevelUp:
+    guild_id: int
+    user_id: int
+    old_level: int
+    new_level: int
+    xp: int
+    rewards: tuple[str, ...] = ()
+
+
+@dataclass
+class GuildXp:
+    totals: dict[int, int] = field(default_factory=dict)
+    # XP earned since the last flush; written as increments so a flush never
+    # overwrites progress made by another worker.
+    pending: dict[int, int] = field(default_factory=dict)
+    last_award: dict[int, float] = field(default_factory=dict)
+    # Members awarded XP before the totals were loaded, with the rules and
+    # caller context of their latest award; their levels are checked once
+    # the load lands.
+    unchecked: dict[int, tuple[LevelingRules, Any]] = field(default_factory=dict)
+    loaded: bool = False
+    loading: bool = False
+    last_active: float = 0.0
+
+
+def _level_up(guild_id: int, user_id: int, old_xp: int, new_xp: int, rules: LevelingRules) -> LevelUp | None:
+    old_level = level_for_xp(old_xp)
+    new_level = level_for_xp(new_xp)
+    if new_level <= old_level:
+        return None
+    return LevelUp(
+        guild_id=guild_id,
+        user_id=user_id,
+        old_level=old_level,
+        new_level=new_level,
+        xp=new_xp,
+        rewards=tuple(rules.rewards_between(old_level, new_level)),
+    )
+
+
+def _load_guild_xp_sync(guild_id: int) -> dict[int, int]:
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(MemberXpModel.user_id, MemberXpModel.xp).where(MemberXpModel.guild_id == guild_id)
+        )
+        return {user_id: xp for user_id, xp in rows}
+    finally:
+        session.close()
+
+
+def _flush_sync(rows: list[dict]) -> None:
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    table = MemberXpModel.__table__
+    stmt = insert(table)
+    new_xp = table.c.xp + stmt.excluded.xp
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.guild_id, table.c.user_id],
+        set_={"xp": new_xp, "level": func.greatest(table.c.level, stmt.excluded.level)}
+        if engine.dialect.name == "postgresql"
+        else {"xp": new_xp, "level": func.max(table.c.level, stmt.excluded.level)},
+    )
+    session = SessionLocal()
+    try:
+        session.execute(stmt, rows)
+        session.commit()
+    finally:
+        session.close()
+
+
+class XpEngine:
+    def __init__(self, flush_interval: float, idle_seconds: float) -> None:
+        self.flush_interval = flush_interval
+        self.idle_seconds = idle_seconds
+        self._guilds: dict[int, GuildXp] = {}
+        self._flush_lock = asyncio.Lock()
+        # Strong references so a load can't be garbage-collected mid-flight.
+        self._loads: set[asyncio.Task[None]] = set()
+        self._on_late_level_up: Callable[[LevelUp, LevelingRules, Any], None] = lambda *_args: None
+
+    def set_late_level_up_listener(self, listener: Callable[[LevelUp, LevelingRules, Any], None]) -> None:
+        # Receives level-ups found when a guild's totals finish loading, with
+        # the context passed to the member's last award().
+        self._on_late_level_up = listener
+
+    def award(
+        self, guild_id: int, user_id: int, rules: LevelingRules, now: float | None = None, context: Any = None
+    ) -> LevelUp | None:
+        # Called on the message path: memory only, never awaits or does I/O.
+        if not rules.enabled or rules.xp_per_message <= 0:
+            return None
+        now = time.monotonic() if now is None else now
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = GuildXp()
+            XP_LOADED_GUILDS.set(len(self._guilds))
+        state.last_active = now
+        last = state.last_award.get(user_id)
+        if last is not None and now - last < rules.cooldown:
+            return None
+        state.last_award[user_id] = now
+        state.pending[user_id] = state.pending.get(user_id, 0) + rules.xp_per_message
+        leaderboards.add(guild_id, user_id, rules.xp_per_message)
+        XP_AWARDS.inc()
+        if not state.loaded:
+            state.unchecked[user_id] = (rules, context)
+            if not state.loading:
+                state.loading = True
+                task = asyncio.get_running_loop().create_task(self._load_guild(guild_id, state))
+                self._loads.add(task)
+                task.add_done_callback(self._loads.discard)
+            return None
+        old_xp = state.totals.get(user_id, 0)
+        new_xp = old_xp + rules.xp_per_message
+        state.totals[user_id] = new_xp
+        return _level_up(guild_id, user_id, old_xp, new_xp, rules)
+
+    def get_xp(self, guild_id: int, user_id: int) -> int | None:
+        state = self._guilds.get(guild_id)
+        if state is None or not state.loaded:
+            return None
+        return state.totals.get(user_id, 0)
+
+    async def _load_guild(self, guild_id: int, state: GuildXp) -> None:
+        try:
+            totals = await asyncio.to_thread(_load_guild_xp_sync, guild_id)
+        except Exception:
+            logging.exception("Failed to load XP for guild %s", guild_id)
+            state.loading = False
+            return
+        # Anything still pending has not reached the database yet.
+        stored = dict(totals)
+        for user_id, delta in state.pending.items():
+            totals[user_id] = totals.get(user_id, 0) + delta
+        state.totals = totals
+        state.loaded = True
+        state.loading = False
+        unchecked, state.unchecked = state.unchecked, {}
+        for user_id, (rules, context) in unchecked.items():
+            level_up = _level_up(guild_id, user_id, stored.get(user_id, 0), totals.get(user_id, 0), rules)
+            if level_up is not None:
+                try:
+                    self._on_late_level_up(level_up, rules, context)
+                except Exception:
+                    logging.exception("Failed to handle level up for %s in guild %s", user_id, guild_id)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            batch: list[dict] = []
+            taken: list[tuple[GuildXp, dict[int, int]]] = []
+            for guild_id, state in self._guilds.items():
+                # A flush during the initial load would be counted twice.
+                if not state.pending or state.loading:
+                    continue
+                pending, state.pending = state.pending, {}
+                taken.append((state, pending))
+                for user_id, delta in pending.items():
+                    total = state.totals.get(user_id) if state.loaded else None
+                    batch.append(
+                        {
+                            "guild_id": guild_id,
+                            "user_id": user_id,
+                            "xp": delta,
+                            "level": level_for_xp(total) if total is not None else 0,
+                        }
+                    )
+            if batch:
+                try:
+                    await asyncio.to_thread(_flush_sync, batch)
+                except Exception:
+                    for state, pending in taken:
+                        for user_id, delta in pending.items():
+                            state.pending[user_id] = state.pending.get(user_id, 0) + delta
+                    raise
+                XP_FLUSHED_ROWS.inc(len(batch))
+            self._sweep()
+            XP_DIRTY_MEMBERS.set(sum(len(state.pending) for state in self._guilds.values()))
+            return len(batch)
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        for guild_id, state in list(self._guilds.items()):
+            if not state.pending and not state.loading and now - state.last_active > self.idle_seconds:
+                del self._guilds[guild_id]
+                continue
+            # Cooldown stamps older than any sane cooldown can't block anything.
+            stale = [user_id for user_id, at in state.last_award.items() if now - at > self.idle_seconds]
+            for user_id in stale:
+                del state.last_award[user_id]
+        XP_LOADED_GUILDS.set(len(self._guilds))
+
+    async def run(self) -> None:
+        # The leaderboard snapshot must be read before the first flush, or
+        # deltas buffered during the rebuild would be counted twice.
+        try:
+            await leaderboards.rebuild()
+        except Exception:
+            logging.exception("Failed to rebuild leaderboards")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to flush member XP")
+
+
+xp_engine = XpEngine(
+    flush_interval=settings.leveling_flush_seconds,
+    idle_seconds=settings.leveling_idle_seconds,
+)
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import asyncio
+from array import array
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+import threading
+from typing import Iterator
+import zlib
+
+from sqlalchemy import and_, delete, or_, select
+
+from .config import settings
+from .database import SessionLocal
+from .models import LogEntryModel
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+
+MAGIC = b"BLOGSEG1"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+COLUMNS = ("id", "timestamp", "server", "user", "action", "details", "level")
+# Low-cardinality columns are dictionary-encoded so filters can skip whole
+# blocks when the wanted value is absent from the block's dictionary.
+DICT_COLUMNS = ("server", "user", "action", "level")
+BLOCK_ROWS = 4096
+_U32 = struct.Struct("<I")
+
+
+def _encode_ids(values: list[int]) -> bytes:
+    deltas = array("q", [values[0]] + [b - a for a, b in zip(values, values[1:])]) if values else array("q")
+    return deltas.tobytes()
+
+
+def _decode_ids(raw: bytes) -> list[int]:
+    deltas = array("q")
+    deltas.frombytes(raw)
+    out = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        out.append(total)
+    return out
+
+
+def _encode_strings(values: list[str]) -> bytes:
+    encoded = [v.encode("utf-8") for v in values]
+    lengths = array("I", [len(v) for v in encoded])
+    return _U32.pack(len(encoded)) + lengths.tobytes() + b"".join(encoded)
+
+
+def _decode_strings(raw: bytes) -> list[str]:
+    (count,) = _U32.unpack_from(raw, 0)
+    lengths = array("I")
+    lengths.frombytes(raw[4 : 4 + count * 4])
+    out = []
+    pos = 4 + count * 4
+    for length in lengths:
+        out.append(raw[pos : pos + length].decode("utf-8"))
+        pos += length
+    return out
+
+
+def _encode_dict(values: list[str]) -> bytes:
+    index: dict[str, int] = {}
+    codes = array("I", [index.setdefault(v, len(index)) for v in values])
+    dictionary = json.dumps(list(index)).encode("utf-8")
+    return _U32.pack(len(dictionary)) + dictionary + codes.tobytes()
+
+
+def _decode_dict(raw: bytes) -> tuple[list[str], array]:
+    (length,) = _U32.unpack_from(raw, 0)
+    dictionary = json.loads(raw[4 : 4 + length].decode("utf-8"))
+    codes = array("I")
+    codes.frombytes(raw[4 + length :])
+    return dictionary, codes
+
+
+@dataclass(frozen=True)
+class BlockInfo:
+    rows: int
+    min_ts: str
+    max_ts: str
+    min_id: int
+    max_id: int
+    columns: dict[str, tuple[int, int]]
+
+
+def write_segment(directory: Path, rows: list[dict]) -> Path:
+    rows = sorted(rows, key=lambda r: (r["timestamp"], r["id"]))
+    blocks = []
+    payload = bytearray()
+    for start in range(0, len(rows), BLOCK_ROWS):
+        chunk = rows[start : start + BLOCK_ROWS]
+        columns = {}
+        for column in COLUMNS:
+            values = [row[column] for row in chunk]
+            if column == "id":
+                raw = _encode_ids(values)
+            elif column in DICT_COLUMNS:
+                raw = _encode_dict(values)
+            else:
+                raw = _encode_strings(values)
+            compressed = zlib.compress(raw, 6)
+            columns[column] = (len(payload), len(compressed))
+            payload += compressed
+        ids = [row["id"] for row in chunk]
+        blocks.append(
+            {
+                "rows": len(chunk),
+                "min_ts": chunk[0]["timestamp"],
+                "max_ts": chunk[-1]["timestamp"],
+                "min_id": min(ids),
+                "max_id": max(ids),
+                "columns": columns,
+            }
+        )
+    header = json.dumps(
+        {
+            "version": 1,
+            "rows": len(rows),
+            "last": [rows[-1]["timestamp"], rows[-1]["id"]],
+            "blocks": blocks,
+        }
+    ).encode("utf-8")
+    first, last = rows[0], rows[-1]
+    name = f"seg-{first['timestamp'][:10]}-{last['timestamp'][:10]}-{first['id']}-{last['id']}.blog"
+    directory.mkdir(parents=True, exist_ok=True)
+    final = directory / name
+    tmp = directory / (name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(_U32.pack(len(header)))
+        fh.write(header)
+        fh.write(payload)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, final)
+    return final
+
+
+class Segment:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a log archive segment")
+        (header_len,) = _U32.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._map[start : start + header_len].decode("utf-8"))
+        self._data_offset = start + header_len
+        self.rows: int = header["rows"]
+        self.last: tuple[str, int] = (header["last"][0], int(header["last"][1]))
+        self.blocks = [
+            BlockInfo(
+                rows=b["rows"],
+                min_ts=b["min_ts"],
+                max_ts=b["max_ts"],
+                min_id=b["min_id"],
+                max_id=b["max_id"],
+                columns={k: (v[0], v[1]) for k, v in b["columns"].items()},
+            )
+            for b in header["blocks"]
+        ]
+        self.min_ts = self.blocks[0].min_ts if self.blocks else ""
+        self.max_ts = self.blocks[-1].max_ts if self.blocks else ""
+
+    def close(self) -> None:
+        with suppress(Exception):
+            self._map.close()
+        self._file.close()
+
+    def column(self, block: BlockInfo, name: str):
+        offset, length = block.columns[name]
+        start = self._data_offset + offset
+        raw = zlib.decompress(self._map[start : start + length])
+        if name == "id":
+            return _decode_ids(raw)
+        if name in DICT_COLUMNS:
+            dictionary, codes = _decode_dict(raw)
+            return [dictionary[c] for c in codes]
+        return _decode_strings(raw)
+
+    def dict_codes(self, block: BlockInfo, name: str) -> tuple[list[str], array]:
+        offset, length = block.columns[name]
+        start = self._data_offset + offset
+        return _decode_dict(zlib.decompress(self._map[start : start + length]))
+
+
+@dataclass(frozen=True)
+class ArchiveQuery:
+    start: str | None = None
+    end: str | None = None
+    action: str | None = None
+    server: str | None = None
+
+    def block_may_match(self, block: BlockInfo) -> bool:
+        if self.start and block.max_ts < self.start:
+            return False
+        if self.end and block.min_ts >= self.end:
+            return False
+        return True
+
+    def block_fully_in_range(self, block: BlockInfo) -> bool:
+        return (not self.start or block.min_ts >= self.start) and (not self.end or block.max_ts < self.end)
+
+
+class ArchiveReader:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._segments: dict[str, Segment] = {}
+        self._lock = threading.Lock()
+
+    def segments(self) -> list[Segment]:
+        with self._lock:
+            names = set()
+            if self.directory.is_dir():
+                names = {entry.name for entry in os.scandir(self.directory) if entry.name.endswith(".blog")}
+            for stale in set(self._segments) - names:
+                self._segments.pop(stale).close()
+            for name in names - set(self._segments):
+                try:
+                    self._segments[name] = Segment(self.directory / name)
+                except (OSError, ValueError):
+                    logging.exception("Skipping unreadable archive segment %s", name)
+            return sorted(self._segments.values(), key=lambda s: s.last)
+
+    def high_water_mark(self) -> tuple[str, int] | None:
+        segments = self.segments()
+        return segments[-1].last if segments else None
+
+    def _matching_indexes(self, segment: Segment, block: BlockInfo, query: ArchiveQuery) -> list[int] | None:
+        candidates: list[int] | None = None
+        for column, wanted in (("action", query.action), ("server", query.server)):
+            if wanted is None:
+                continue
+            dictionary, codes = segment.dict_codes(block, column)
+            if wanted not in dictionary:
+                return []
+            code = dictionary.index(wanted)
+            hits = [i for i, c in enumerate(codes) if c == code]
+            candidates = hits if candidates is None else sorted(set(candidates) & set(hits))
+        if not query.block_fully_in_range(block):
+            timestamps = segment.column(block, "timestamp")
+            pool = candidates if candidates is not None else range(block.rows)
+            candidates = [
+                i for i in pool
+                if (not query.start or timestamps[i] >= query.start) and (not query.end or timestamps[i] < query.end)
+            ]
+        return candidates
+
+    def count(self, query: ArchiveQuery = ArchiveQuery()) -> int:
+        total = 0
+        for segment in self.segments():
+            for block in segment.blocks:
+                if not query.block_may_match(block):
+                    continue
+                indexes = self._matching_indexes(segment, block, query)
+                total += block.rows if indexes is None else len(indexes)
+        return total
+
+    def scan(self, query: ArchiveQuery = ArchiveQuery(), newest_first: bool = True, limit: int | None = None) -> Iterator[dict]:
+        produced = 0
+        segments = self.segments()
+        if newest_first:
+            segments = list(reversed(segments))
+        for segment in segments:
+            blocks = reversed(segment.blocks) if newest_first else segment.blocks
+            for block in blocks:
+                if not query.block_may_match(block):
+                    continue
+                indexes = self._matching_indexes(segment, block, query)
+                if indexes is not None and not indexes:
+                    continue
+                columns = {name: segment.column(block, name) for name in COLUMNS}
+                order = list(range(block.rows)) if indexes is None else list(indexes)
+                if newest_first:
+                    order.reverse()
+                for i in order:
+                    yield {name: columns[name][i] for name in COLUMNS}
+                    produced += 1
+                    if limit is not None and produced >= limit:
+                        return
+
+
+archive_reader = ArchiveReader(Path(settings.log_archive_dir))
+
+
+@contextmanager
+def _archive_lock(directory: Path) -> Iterator[bool]:
+    directory.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield True
+        return
+    with open(directory / ".lock", "w") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _at_or_before(mark: tuple[str, int]):
+    ts, row_id = mark
+    return or_(LogEntryModel.timestamp < ts, and_(LogEntryModel.timestamp == ts, LogEntryModel.id <= row_id))
+
+
+def archive_logs_sync(now: datetime | None = None) -> dict:
+    result = {"segments": 0, "rows": 0, "skipped": False}
+    if not settings.log_archive_enabled:
+        result["skipped"] = True
+        return result
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=settings.log_archive_after_days)).strftime(TIMESTAMP_FORMAT)
+    directory = archive_reader.directory
+    with _archive_lock(directory) as locked:
+        if not locked:
+            result["skipped"] = True
+            return result
+        mark = archive_reader.high_water_mark()
+        session = SessionLocal()
+        try:
+            if mark is not None:
+                # Rows already in a segment but not yet deleted (e.g. the
+                # process died between writing the file and the DELETE).
+                session.execute(delete(LogEntryModel).where(_at_or_before(mark)))
+                session.commit()
+            while True:
+                stmt = select(LogEntryModel).where(LogEntryModel.timestamp < cutoff)
+                stmt = stmt.order_by(LogEntryModel.timestamp, LogEntryModel.id).limit(settings.log_archive_segment_rows)
+                rows = [
+                    {column: getattr(row, column) for column in COLUMNS}
+                    for row in session.scalars(stmt)
+                ]
+                if not rows:
+                    break
+                write_segment(directory, rows)
+                mark = (rows[-1]["timestamp"], rows[-1]["id"])
+                session.execute(delete(LogEntryModel).where(_at_or_before(mark)))
+                session.commit()
+                result["segments"] += 1
+                result["rows"] += len(rows)
+        finally:
+            session.close()
+    if result["rows"]:
+        logging.info("Archived %d log rows into %d segments", result["rows"], result["segments"])
+    return result
+
+
+async def run_log_archiver() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(archive_logs_sync)
+        except Exception:
+            logging.exception("Log archiving failed")
+        await asyncio.sleep(settings.log_archive_interval_seconds)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+import re
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import engine
+from .log_archive import archive_reader
+
+
+PARENT_TABLE = "bot_logs"
+DEFAULT_PARTITION = "bot_logs_default"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Arbitrary constant shared by all workers so only one runs DDL at a time.
+MAINTENANCE_LOCK_KEY = 0x626F745F6C6F6773
+_PARTITION_NAME = re.compile(r"^bot_logs_p(\d{6}|\d{8})$")
+
+
+@dataclass(frozen=True)
+class PartitionRange:
+    name: str
+    start: datetime
+    end: datetime
+
+    def overlaps(self, other: "PartitionRange") -> bool:
+        return self.start < other.end and other.start < self.end
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def partition_for(moment: datetime, interval: str) -> PartitionRange:
+    if interval == "day":
+        start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        return PartitionRange(f"{PARENT_TABLE}_p{start:%Y%m%d}", start, start + timedelta(days=1))
+    start = _month_start(moment)
+    return PartitionRange(f"{PARENT_TABLE}_p{start:%Y%m}", start, _add_months(start, 1))
+
+
+def parse_partition_name(name: str) -> PartitionRange | None:
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    suffix = match.group(1)
+    if len(suffix) == 8:
+        start = datetime.strptime(suffix, "%Y%m%d").replace(tzinfo=timezone.utc)
+        return PartitionRange(name, start, start + timedelta(days=1))
+    start = datetime.strptime(suffix, "%Y%m").replace(tzinfo=timezone.utc)
+    return PartitionRange(name, start, _add_months(start, 1))
+
+
+def upcoming_partitions(now: datetime, interval: str, count: int) -> list[PartitionRange]:
+    ranges = []
+    current = partition_for(now, interval)
+    for _ in range(max(1, count + 1)):
+        ranges.append(current)
+        current = partition_for(current.end, interval)
+    return ranges
+
+
+def _is_partitioned(conn) -> bool:
+    row = conn.execute(
+        text("SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+             "WHERE c.relname = :name AND n.nspname = current_schema()"),
+        {"name": PARENT_TABLE},
+    ).first()
+    return bool(row) and row[0] == "p"
+
+
+def _existing_partitions(conn) -> list[str]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :name"
+        ),
+        {"name": PARENT_TABLE},
+    )
+    return [row[0] for row in rows]
+
+
+def maintain_partitions_sync(now: datetime | None = None) -> dict:
+    result = {"created": [], "removed": [], "skipped": False}
+    if engine.dialect.name != "postgresql":
+        result["skipped"] = True
+        return result
+    now = now or datetime.now(timezone.utc)
+    # DDL runs in autocommit so a failed CREATE doesn't poison later statements.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not _is_partitioned(conn):
+            result["skipped"] = True
+            return result
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar()
+        if not locked:
+            result["skipped"] = True
+            return result
+        try:
+            existing = [r for r in (parse_partition_name(n) for n in _existing_partitions(conn)) if r]
+            for candidate in upcoming_partitions(now, settings.log_partition_interval, settings.log_partition_premake):
+                if any(candidate.overlaps(r) for r in existing):
+                    continue
+                try:
+                    conn.execute(
+                        text(
+                            f'CREATE TABLE IF NOT EXISTS "{candidate.name}" PARTITION OF {PARENT_TABLE} '
+                            f"FOR VALUES FROM ('{candidate.start:{TIMESTAMP_FORMAT}}') "
+                            f"TO ('{candidate.end:{TIMESTAMP_FORMAT}}')"
+                        )
+                    )
+                except Exception:
+                    # Typically rows for this range already landed in the
+                    # default partition; leave them there and retry next run.
+                    logging.exception("Failed to create log partition %s", candidate.name)
+                    continue
+                existing.append(candidate)
+                result["created"].append(candidate.name)
+
+            if settings.log_retention_days > 0:
+                cutoff = now - timedelta(days=settings.log_retention_days)
+                if settings.log_archive_enabled:
+                    # Never drop rows the archiver hasn't copied out yet.
+                    mark = archive_reader.high_water_mark()
+                    archived_until = (
+                        datetime.strptime(mark[0], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+                        if mark else datetime.min.replace(tzinfo=timezone.utc)
+                    )
+                    cutoff = min(cutoff, archived_until)
+                for expired in sorted((r for r in existing if r.end <= cutoff), key=lambda r: r.start):
+                    conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{expired.name}"'))
+                    if settings.log_retention_action == "drop":
+                        conn.execute(text(f'DROP TABLE "{expired.name}"'))
+                    result["removed"].append(expired.name)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+    if result["created"] or result["removed"]:
+        logging.info("Log partition maintenance: created=%s removed=%s", result["created"], result["removed"])
+    return result
+
+
+async def run_partition_maintenance() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(maintain_partitions_sync)
+        except Exception:
+            logging.exception("Log partition maintenance failed")
+        await asyncio.sleep(settings.log_partition_maintenance_seconds)
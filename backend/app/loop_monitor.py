@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from contextlib import suppress
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from .config import settings
+from .metrics import REGISTRY
+
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the loop monitor should have woken up and when it did.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = REGISTRY.counter("event_loop_stalls_total", "Times the event loop was blocked past the stall threshold.")
+
+
+class ProfileInProgress(RuntimeError):
+    pass
+
+
+class ProfileRateLimited(RuntimeError):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Profiles are limited to one every {settings.profile_min_interval_seconds:g}s.")
+        self.retry_after = retry_after
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float) -> None:
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stall: dict | None = None
+        self._heartbeat = time.monotonic()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._profile_lock = threading.Lock()
+        self._last_profile_at = float("-inf")
+
+    @property
+    def loop_thread_id(self) -> int | None:
+        return self._loop_thread_id
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure_lag())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "intervalSeconds": self.interval,
+            "stallThresholdSeconds": self.stall_threshold,
+            "lastLagSeconds": round(self.last_lag, 6),
+            "maxLagSeconds": round(self.max_lag, 6),
+            "stalls": self.stalls,
+            "lastStall": self.last_stall,
+        }
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._heartbeat = time.monotonic()
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self) -> None:
+        # Runs off-loop, so it can see the loop thread's stack *while* it is
+        # blocked instead of only learning about the stall afterwards.
+        reported = False
+        poll = max(0.01, self.stall_threshold / 2)
+        while not self._stop.wait(poll):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for < self.stall_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            self._report_stall(blocked_for)
+
+    def _report_stall(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id or 0)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+        task = None
+        if self._loop is not None:
+            with suppress(Exception):
+                task = asyncio.current_task(self._loop)
+        coroutine = repr(task.get_coro()) if task is not None else "<no task: loop callback>"
+        self.stalls += 1
+        LOOP_STALLS.inc()
+        self.last_stall = {
+            "blockedSeconds": round(blocked_for, 3),
+            "coroutine": coroutine,
+            "stack": stack,
+            "detectedAt": time.time(),
+        }
+        logging.warning("Event loop blocked for %.3fs in %s\n%s", blocked_for, coroutine, stack)
+
+    def sample_profile(self, seconds: float, interval: float, all_threads: bool = False) -> str:
+        if not self._profile_lock.acquire(blocking=False):
+            raise ProfileInProgress("A profile is already running.")
+        try:
+            # Sampling costs the loop thread a stack walk per interval, so
+            # back-to-back profiles are refused rather than queued.
+            wait = self._last_profile_at + settings.profile_min_interval_seconds - time.monotonic()
+            if wait > 0:
+                raise ProfileRateLimited(wait)
+            self._last_profile_at = time.monotonic()
+            return collect_profile(seconds, interval, None if all_threads else self._loop_thread_id)
+        finally:
+            self._profile_lock.release()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collect_profile(seconds: float, interval: float, thread_id: int | None = None) -> str:
+    # Output is the "collapsed stack" format consumed by flamegraph.pl and
+    # speedscope: one line per unique stack, frames joined by ';', then a count.
+    own_thread = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    counts: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frames = sys._current_frames()
+        targets = [thread_id] if thread_id is not None else list(frames)
+        for ident in targets:
+            if ident == own_thread:
+                continue
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval_seconds,
+    stall_threshold=settings.loop_stall_threshold_seconds,
+)
@@ -9,37 +9,80 @@ from fastapi import FastAPI
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
+from .active_users import active_users
 from .config import settings
 from .discord_bot import start_bot, stop_bot
-from .database import init_db
+from .event_recorder import event_recorder
+from .database import QueryStatsMiddleware
+from .leveling import xp_engine
+from .log_archive import run_log_archiver
+from .log_partitions import run_partition_maintenance
+from .loop_monitor import loop_monitor
+from .metrics import MetricsMiddleware
+from .passwords import password_hasher
 from .routes import router
+from .startup import readiness
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    init_db()
-    bot_task: asyncio.Task[None] | None = None
-    if settings.discord_autostart:
-        bot_task = asyncio.create_task(start_bot())
-
-        def _log_task_result(task: asyncio.Task[None]) -> None:
-            try:
-                task.result()
-            except asyncio.CancelledError:
-                pass
-            except Exception:
-                logging.exception("Discord bot failed to start; continuing without bot.")
-
-        bot_task.add_done_callback(_log_task_result)
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+    # Serve liveness immediately; readiness flips once the schema check and
+    # cache warmup finish, and only then do background jobs and the bot start.
+    background: list[asyncio.Task[None]] = []
+
+    async def _start() -> None:
+        await readiness.run()
+        if not readiness.ready:
+            return
+        background.append(asyncio.create_task(run_partition_maintenance()))
+        if settings.log_archive_enabled:
+            background.append(asyncio.create_task(run_log_archiver()))
+        background.append(asyncio.create_task(xp_engine.run()))
+        background.append(asyncio.create_task(active_users.run()))
+        if event_recorder.enabled:
+            background.append(asyncio.create_task(event_recorder.run()))
+        if settings.discord_autostart:
+            await start_bot()
+
+    def _log_task_result(task: asyncio.Task[None]) -> None:
+        try:
+            task.result()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logging.exception("Startup failed; background jobs or the Discord bot may not be running.")
+
+    startup_task = asyncio.create_task(_start())
+    startup_task.add_done_callback(_log_task_result)
 
     yield
 
     if settings.discord_autostart:
         await stop_bot()
-    if bot_task is not None:
-        bot_task.cancel()
+    startup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await startup_task
+    for task in background:
+        task.cancel()
         with suppress(asyncio.CancelledError):
-            await bot_task
+            await task
+    try:
+        await xp_engine.flush()
+    except Exception:
+        logging.exception("Failed to flush member XP on shutdown")
+    try:
+        await active_users.flush()
+    except Exception:
+        logging.exception("Failed to flush active-user sketches on shutdown")
+    if event_recorder.enabled:
+        try:
+            await event_recorder.flush()
+        except Exception:
+            logging.exception("Failed to write gateway event recording on shutdown")
+    password_hasher.shutdown()
+    await loop_monitor.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -52,6 +95,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(router)
 
 
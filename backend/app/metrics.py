@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from bisect import bisect_left
+import functools
+import math
+import re
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: object):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        # A fresh child holding one label set's value.
+        ...
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: tuple[str, ...], child) -> list[str]:
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_format_value(child.get())}"]
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        # Evaluated at scrape time, so sampling costs nothing between scrapes.
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: _HistogramChild) -> None:
+        self._child = child
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _render_child(self, key: tuple[str, ...], child: _HistogramChild) -> list[str]:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+        labels = _label_str(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+DISCORD_EVENT_SECONDS = REGISTRY.histogram(
+    "discord_event_duration_seconds", "Time spent in Discord event handlers.", ("event",)
+)
+DISCORD_EVENTS = REGISTRY.counter(
+    "discord_events_total", "Discord events handled, by outcome.", ("event", "outcome")
+)
+BOT_OPERATION_SECONDS = REGISTRY.histogram(
+    "bot_operation_duration_seconds", "Time spent in internal bot operations.", ("operation",)
+)
+DISCORD_REST_SECONDS = REGISTRY.histogram(
+    "discord_rest_request_duration_seconds", "Discord REST call latency.", ("method", "route")
+)
+DISCORD_REST_RESPONSES = REGISTRY.counter(
+    "discord_rest_responses_total", "Discord REST responses by status code.", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "API request latency.", ("method", "route")
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    "http_responses_total", "API responses by status code.", ("method", "route", "status")
+)
+DB_STATEMENT_SECONDS = REGISTRY.histogram(
+    "db_statement_duration_seconds", "SQL statement execution time.", ("operation",)
+)
+DB_CONNECTION_HOLD_SECONDS = REGISTRY.histogram(
+    "db_connection_hold_seconds", "Time a pooled connection is held between checkout and checkin."
+)
+DB_SCOPE_STATEMENTS = REGISTRY.histogram(
+    "db_statements_per_scope",
+    "SQL statements issued per API request or bot event.",
+    ("scope",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+DB_SCOPE_SECONDS = REGISTRY.histogram(
+    "db_time_per_scope_seconds", "Total SQL time per API request or bot event.", ("scope",)
+)
+DB_CONNECTIONS_IN_USE = REGISTRY.gauge("db_connections_in_use", "Pooled connections currently checked out.")
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = REGISTRY.counter("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.")
+DB_POOL_PINGS = REGISTRY.counter("db_pool_pings_total", "Liveness pings issued on checkout.", ("result",))
+DB_POOL_SIZE = REGISTRY.gauge("db_pool_size", "Configured persistent connections in the pool.")
+DB_POOL_OVERFLOW = REGISTRY.gauge("db_pool_overflow", "Connections open beyond the pool size.")
+DB_POOL_UTILIZATION = REGISTRY.gauge(
+    "db_pool_utilization", "Checked-out connections as a fraction of pool size plus max overflow."
+)
+DB_REPLICA_LAG_SECONDS = REGISTRY.gauge("db_replica_lag_seconds", "Replay lag of the read replica at the last check.")
+DB_READ_ROUTES = REGISTRY.counter("db_read_routes_total", "Read-only sessions by the engine they were sent to.", ("target",))
+THREAD_POOL_QUEUE = REGISTRY.gauge(
+    "asyncio_default_executor_queue_depth", "Work items waiting in the default executor used by asyncio.to_thread."
+)
+THREAD_POOL_THREADS = REGISTRY.gauge(
+    "asyncio_default_executor_threads", "Threads started by the default executor used by asyncio.to_thread."
+)
+
+
+def observe_event(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    name = func.__name__
+    seconds = DISCORD_EVENT_SECONDS.labels(name)
+    ok = DISCORD_EVENTS.labels(name, "ok")
+    failed = DISCORD_EVENTS.labels(name, "error")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            failed.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - started)
+        ok.inc()
+        return result
+
+    return wrapper
+
+
+def observe_operation(operation: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    seconds = BOT_OPERATION_SECONDS.labels(operation)
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                seconds.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+_SNOWFLAKE = re.compile(r"/\d{5,}")
+_ROUTE_TOKEN = re.compile(r"(/(?:webhooks|interactions)/\{id\})/[^/]+")
+
+
+def normalize_discord_route(path: str) -> str:
+    route = _SNOWFLAKE.sub("/{id}", path)
+    route = _ROUTE_TOKEN.sub(r"\1/{token}", route)
+    if route.startswith("/api/v"):
+        route = route.split("/", 3)[-1]
+        route = "/" + route
+    return route
+
+
+def discord_trace_config():
+    import aiohttp
+
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(_session, context, _params) -> None:
+        context.started = time.perf_counter()
+
+    async def on_request_end(_session, context, params) -> None:
+        route = normalize_discord_route(params.url.path)
+        method = params.method
+        DISCORD_REST_SECONDS.labels(method, route).observe(time.perf_counter() - context.started)
+        DISCORD_REST_RESPONSES.labels(method, route, params.response.status).inc()
+
+    async def on_request_exception(_session, context, params) -> None:
+        route = normalize_discord_route(params.url.path)
+        DISCORD_REST_RESPONSES.labels(params.method, route, "error").inc()
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+def _collect_default_executor() -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    executor = getattr(loop, "_default_executor", None)
+    if executor is None:
+        THREAD_POOL_QUEUE.set(0)
+        THREAD_POOL_THREADS.set(0)
+        return
+    THREAD_POOL_QUEUE.set(executor._work_queue.qsize())
+    THREAD_POOL_THREADS.set(len(executor._threads))
+
+
+REGISTRY.add_collector(_collect_default_executor)
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Label by route template, not raw path, to keep cardinality bounded.
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "GET")
+            HTTP_REQUEST_SECONDS.labels(method, path).observe(time.perf_counter() - started)
+            HTTP_RESPONSES.labels(method, path, status).inc()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import BigInteger, DateTime, Integer, String, Text, Boolean
+from sqlalchemy import BigInteger, DateTime, Integer, LargeBinary, String, Text, Boolean
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -33,7 +33,8 @@ class LogEntryModel(Base):
     __tablename__ = "bot_logs"
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    timestamp: Mapped[str] = mapped_column(String(32), nullable=False)
+    # Part of the key because bot_logs is range-partitioned on it.
+    timestamp: Mapped[str] = mapped_column(String(32), primary_key=True)
     server: Mapped[str] = mapped_column(String(128), nullable=False)
     user: Mapped[str] = mapped_column(String(128), nullable=False)
     action: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -60,3 +61,58 @@ class ServerSettingsModel(Base):
     prefix: Mapped[str] = mapped_column(String(16), default="!", nullable=False)
     language: Mapped[str] = mapped_column(String(32), default="english", nullable=False)
     modules: Mapped[list] = mapped_column(JSONB, default=list, nullable=False)
+
+
+class AiIntentModel(Base):
+    __tablename__ = "ai_intents"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    label: Mapped[str] = mapped_column(String(128), nullable=False)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class AiIntentStateModel(Base):
+    __tablename__ = "ai_intent_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+class GuildSettingsOverrideModel(Base):
+    __tablename__ = "guild_settings_overrides"
+
+    guild_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    automod: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    welcome: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    leave: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    leveling: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+
+
+class MemberXpModel(Base):
+    __tablename__ = "member_xp"
+
+    guild_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    xp: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    level: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class AppCommandSyncModel(Base):
+    __tablename__ = "app_command_sync"
+
+    # 0 for the global command set, otherwise a guild id.
+    scope_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    synced_at: Mapped[str] = mapped_column(String(32), nullable=False)
+
+
+class ActiveUserSketchModel(Base):
+    __tablename__ = "active_user_sketches"
+
+    # 0 holds the all-guild sketch for the day.
+    guild_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)
+    # zlib-compressed HyperLogLog registers.
+    registers: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import bcrypt
+
+from .config import settings
+
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    # bcrypt's C implementation releases the GIL, so a small thread pool keeps
+    # hashing off the event loop without the fork/pickle cost of a process pool.
+    def __init__(self, rounds: int, workers: int, max_pending: int) -> None:
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password-hash")
+        self._max_pending = max(1, max_pending)
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(bcrypt.hashpw, password.encode(), bcrypt.gensalt(self.rounds))
+        return hashed.decode()
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        try:
+            return await self._run(bcrypt.checkpw, password.encode(), password_hash.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        parts = password_hash.split("$")
+        if len(parts) < 4 or not parts[2].isdigit():
+            return True
+        return int(parts[2]) != self.rounds
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self._pending >= self._max_pending:
+            raise PasswordHasherBusy("Too many concurrent password operations.")
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        future = self._executor.submit(func, *args)
+        # Release the slot when the work actually finishes, not when the caller
+        # stops waiting, so cancelled requests can't overcommit the pool.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from .config import settings
+from .database import query_scope
+from .metrics import REGISTRY
+
+
+class Priority(IntEnum):
+    MODERATION = 0
+    COMMAND = 1
+    COSMETIC = 2
+
+
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge("event_pipeline_queue_depth", "Stages waiting to run, by priority.", ("priority",))
+PIPELINE_LANES = REGISTRY.gauge("event_pipeline_lanes", "Guilds with queued or running stages.")
+PIPELINE_BUSY_WORKERS = REGISTRY.gauge("event_pipeline_busy_workers", "Workers currently running a stage.")
+PIPELINE_WAIT_SECONDS = REGISTRY.histogram(
+    "event_pipeline_wait_seconds",
+    "Time a stage spent queued before a worker picked it up, including behind a slow stage in the same guild.",
+    ("priority",),
+)
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram("event_pipeline_stage_seconds", "Time spent running a stage.", ("stage",))
+PIPELINE_STAGES = REGISTRY.counter("event_pipeline_stages_total", "Stages handled, by outcome.", ("stage", "outcome"))
+
+
+@dataclass
+class _Job:
+    stage: str
+    priority: Priority
+    func: Callable[..., Awaitable[Any]]
+    args: tuple
+    enqueued: float
+
+
+class _Lane:
+    # One guild's backlog. At most one worker runs a lane at a time, so a
+    # guild's stages of the same priority run in the order they arrived and
+    # a flood in one guild can hold at most one worker. The flip side is that
+    # a slow stage (a rate-limited REST call, say) holds its lane, and that
+    # guild's moderation waits behind it; event_pipeline_wait_seconds for
+    # moderation is the signal to watch.
+    __slots__ = ("queues", "running", "queued")
+
+    def __init__(self) -> None:
+        self.queues: tuple[deque[_Job], ...] = tuple(deque() for _ in Priority)
+        self.running = False
+        # Best priority this lane currently has an entry for in the ready heap.
+        self.queued: int | None = None
+
+    def __bool__(self) -> bool:
+        return any(self.queues)
+
+    def next_priority(self) -> int:
+        return next(priority for priority, queue in enumerate(self.queues) if queue)
+
+    def pop(self) -> _Job:
+        return self.queues[self.next_priority()].popleft()
+
+
+class EventPipeline:
+    # Per-guild ordered lanes served by a fixed pool of workers. Workers take
+    # one stage at a time from whichever ready lane has the most urgent work,
+    # so moderation in any guild runs ahead of queued commands and welcomes.
+    # Once the total backlog passes a priority's shed depth, new stages of
+    # that priority are dropped; moderation is never shed.
+    def __init__(self, workers: int, shed_depths: dict[Priority, int]) -> None:
+        self.workers = workers
+        self.shed_depths = shed_depths
+        self._lanes: dict[int, _Lane] = {}
+        self._ready: asyncio.PriorityQueue[tuple[int, int, int]] = asyncio.PriorityQueue()
+        self._depths = [0] * len(Priority)
+        self._seq = 0
+        self._busy = 0
+        self._tasks: list[asyncio.Task[None]] = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def depth(self) -> int:
+        return sum(self._depths)
+
+    def submit(self, guild_id: int, priority: Priority, stage: str, func: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        limit = self.shed_depths.get(priority)
+        if limit is not None and self.depth >= limit:
+            PIPELINE_STAGES.labels(stage, "shed").inc()
+            return False
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        lane = self._lanes.get(guild_id)
+        if lane is None:
+            lane = self._lanes[guild_id] = _Lane()
+            PIPELINE_LANES.set(len(self._lanes))
+        lane.queues[priority].append(_Job(stage, priority, func, args, time.perf_counter()))
+        self._depths[priority] += 1
+        PIPELINE_QUEUE_DEPTH.labels(priority.name.lower()).inc()
+        self._idle.clear()
+        if not lane.running:
+            self._schedule(guild_id, lane)
+        return True
+
+    def _schedule(self, guild_id: int, lane: _Lane) -> None:
+        # Entries left behind once a lane has run are skipped by the worker
+        # that pops them, so the heap never has to be searched or rebuilt.
+        priority = lane.next_priority()
+        if lane.queued is None or priority < lane.queued:
+            lane.queued = priority
+            self._seq += 1
+            self._ready.put_nowait((priority, self._seq, guild_id))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, guild_id = await self._ready.get()
+            lane = self._lanes.get(guild_id)
+            if lane is None or lane.running or not lane:
+                continue
+            lane.running = True
+            lane.queued = None
+            job = lane.pop()
+            self._depths[job.priority] -= 1
+            PIPELINE_QUEUE_DEPTH.labels(job.priority.name.lower()).dec()
+            PIPELINE_WAIT_SECONDS.labels(job.priority.name.lower()).observe(time.perf_counter() - job.enqueued)
+            self._busy += 1
+            PIPELINE_BUSY_WORKERS.set(self._busy)
+            started = time.perf_counter()
+            try:
+                with query_scope(f"stage:{job.stage}"):
+                    await job.func(*job.args)
+                PIPELINE_STAGES.labels(job.stage, "ok").inc()
+            except Exception:
+                PIPELINE_STAGES.labels(job.stage, "error").inc()
+                logging.exception("Event pipeline stage %s failed", job.stage)
+            finally:
+                PIPELINE_STAGE_SECONDS.labels(job.stage).observe(time.perf_counter() - started)
+                self._busy -= 1
+                PIPELINE_BUSY_WORKERS.set(self._busy)
+                lane.running = False
+                if lane:
+                    self._schedule(guild_id, lane)
+                else:
+                    del self._lanes[guild_id]
+                    PIPELINE_LANES.set(len(self._lanes))
+                if not self._busy and not self.depth:
+                    self._idle.set()
+
+    async def drain(self) -> None:
+        await self._idle.wait()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Event pipeline closed with %s stages still queued", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+def build_pipeline() -> EventPipeline:
+    return EventPipeline(
+        workers=settings.pipeline_workers,
+        shed_depths={
+            Priority.COMMAND: settings.pipeline_command_shed_depth,
+            Priority.COSMETIC: settings.pipeline_cosmetic_shed_depth,
+        },
+    )
@@ -1,18 +1,51 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import io
 from typing import List
 from datetime import datetime, timezone, timedelta
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 import httpx
-import bcrypt
 
+from .active_users import active_users
+from .auth import (
+    CachedUser,
+    create_token,
+    remember_user,
+    request_token,
+    require_admin,
+    require_user,
+    user_cache,
+)
+from .commands import prefix_store
 from .config import settings
 from .discord_bot import bot_manager
-from .database import SessionLocal
-from .models import BotSettingsModel, LogEntryModel, CommandModel, ServerSettingsModel, UserModel
+from .database import ReadSessionLocal, SessionLocal
+from .guild_settings import OVERRIDABLE_SECTIONS, merge_sections
+from .heavy_hitters import activity_tracker
+from .intents import IntentRecord, IntentSnapshot, intent_store
+from .leaderboard import leaderboards
+from .leveling import level_for_xp
+from .log_archive import ArchiveQuery, archive_reader
+from .startup import readiness
+from .timeseries import EARLIEST, WELL_FORMED_TIMESTAMP, action_series, choose_bucket, format_time, parse_duration
+from .passwords import PasswordHasherBusy, password_hasher
+from .loop_monitor import ProfileInProgress, ProfileRateLimited, loop_monitor
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from .models import (
+    BotSettingsModel,
+    CommandModel,
+    GuildSettingsOverrideModel,
+    LogEntryModel,
+    ServerSettingsModel,
+    UserModel,
+)
 
 
 router = APIRouter()
@@ -26,6 +59,15 @@ def get_db() -> Session:
         db.close()
 
 
+def get_read_db() -> Session:
+    # Replica when configured and caught up; see ReadSession.
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 class StatusResponse(BaseModel):
     ready: bool
     guild_count: int
@@ -128,6 +170,50 @@ class AnalyticsData(BaseModel):
     peakHours: List[dict]
     topServers: List[dict]
     topUsers: List[dict]
+    topCommands: List[dict] = Field(default_factory=list)
+
+
+class ActivityEntry(BaseModel):
+    id: str
+    name: str
+    count: int
+    # count may overstate the true total by up to this much.
+    error: int
+
+
+class GuildActivity(BaseModel):
+    windowSeconds: float
+    topUsers: List[ActivityEntry]
+    topCommands: List[ActivityEntry]
+    topChatters: List[ActivityEntry]
+
+
+class ActiveUsersDay(BaseModel):
+    day: str
+    users: int
+
+
+class ActiveUsersResponse(BaseModel):
+    days: List[ActiveUsersDay]
+    distinctUsers: int
+
+
+class SeriesPoint(BaseModel):
+    time: str
+    value: int
+
+
+class ActionSeries(BaseModel):
+    action: str
+    total: int
+    points: List[SeriesPoint]
+
+
+class TimeSeriesResponse(BaseModel):
+    start: str
+    end: str
+    bucketSeconds: int
+    series: List[ActionSeries]
 
 
 class LogItem(BaseModel):
@@ -156,6 +242,33 @@ class BotSettings(BaseModel):
     leveling: dict
 
 
+class GuildSettingsOverrides(BaseModel):
+    automod: dict = Field(default_factory=dict)
+    welcome: dict = Field(default_factory=dict)
+    leave: dict = Field(default_factory=dict)
+    leveling: dict = Field(default_factory=dict)
+
+
+class GuildSettingsView(BaseModel):
+    overrides: GuildSettingsOverrides
+    effective: BotSettings
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    userId: str
+    name: str
+    xp: int
+    level: int
+
+
+class LeaderboardResponse(BaseModel):
+    total: int
+    entries: List[LeaderboardEntry]
+    member: LeaderboardEntry | None = None
+    around: List[LeaderboardEntry] = Field(default_factory=list)
+
+
 class MessageRequest(BaseModel):
     channel_id: int = Field(..., description="Discord channel id")
     content: str = Field(..., min_length=1, max_length=2000)
@@ -206,42 +319,11 @@ class AiGenerateRequest(BaseModel):
     intent_id: str | None = None
 
 
-AI_INTENTS: List[AiIntent] = []
-
-
-def _pick_intent(intents: List[AiIntent], intent_id: str | None) -> AiIntent | None:
-    if intent_id:
-        return next((i for i in intents if i.id == intent_id), None)
-    enabled = next((i for i in intents if i.enabled), None)
-    return enabled or (intents[0] if intents else None)
-
-
-def _build_intent_context(intents: List[AiIntent]) -> str:
-    enabled = [intent for intent in intents if intent.enabled]
-    if not enabled:
-        return "No predefined intents are enabled."
-    lines = ["Enabled intents:"]
-    for intent in enabled:
-        lines.append(f"- {intent.label}: {intent.response}")
-    return "\n".join(lines)
-
-
-async def _generate_groq_response(prompt: str, intents: List[AiIntent], intent_id: str | None) -> str | None:
+async def _generate_groq_response(prompt: str, snapshot: IntentSnapshot, intent_id: str | None) -> str | None:
     if not settings.groq_api_key:
         return None
 
-    chosen = _pick_intent(intents, intent_id)
-    intent_context = _build_intent_context(intents)
-    preferred = ""
-    if chosen:
-        preferred = f"\nPreferred intent: {chosen.label}. Template: {chosen.response}"
-
-    system_prompt = (
-        "You are a helpful assistant for a Discord bot control panel. "
-        "Use the intent templates as guidance for concise replies. "
-        "Return only the response text." 
-        f"\n{intent_context}{preferred}"
-    )
+    system_prompt = snapshot.system_prompt(intent_id)
 
     payload = {
         "model": settings.groq_model,
@@ -269,6 +351,49 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@router.get("/health/live")
+async def health_live() -> dict:
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def health_ready(response: Response) -> dict:
+    snapshot = readiness.snapshot()
+    if not snapshot["ready"]:
+        response.status_code = 503
+    return snapshot
+
+
+@router.get("/metrics")
+async def metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@router.get("/admin/loop")
+async def loop_health(_: CachedUser = Depends(require_admin)) -> dict:
+    return loop_monitor.snapshot()
+
+
+@router.get("/admin/profile", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = 5.0,
+    interval_ms: float = 10.0,
+    all_threads: bool = False,
+    _: CachedUser = Depends(require_admin),
+) -> PlainTextResponse:
+    seconds = min(max(seconds, 0.1), settings.profile_max_seconds)
+    interval = min(max(interval_ms, 1.0), 1000.0) / 1000.0
+    try:
+        collapsed = await asyncio.to_thread(loop_monitor.sample_profile, seconds, interval, all_threads)
+    except ProfileInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except ProfileRateLimited as exc:
+        headers = {"Retry-After": str(int(exc.retry_after) + 1)}
+        raise HTTPException(status_code=429, detail=str(exc), headers=headers) from exc
+    headers = {"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+    return PlainTextResponse(collapsed, headers=headers)
+
+
 @router.get("/bot/status", response_model=StatusResponse)
 async def bot_status() -> StatusResponse:
     return StatusResponse(ready=bot_manager.is_ready(), guild_count=len(list(bot_manager.guilds())))
@@ -324,81 +449,134 @@ async def _get_primary_guild():
     return bot_manager.get_guild(guild_id) if guild_id else None
 
 
+@router.get("/guilds/{guild_id}/activity", response_model=GuildActivity)
+async def guild_activity(guild_id: int, range_param: str = "7d", limit: int = Query(10, ge=1, le=50)) -> GuildActivity:
+    span = parse_duration(range_param)
+    if span is None:
+        raise HTTPException(status_code=400, detail="Invalid range")
+    since = datetime.now(timezone.utc).timestamp() - span
+
+    def entries(stream: str) -> List[ActivityEntry]:
+        return [
+            ActivityEntry(id=str(h.key), name=h.label, count=h.count, error=h.error)
+            for h in activity_tracker.top(stream, limit, since, guild_id=guild_id)
+        ]
+
+    return GuildActivity(
+        windowSeconds=activity_tracker.window_seconds,
+        topUsers=entries("command_users"),
+        topCommands=entries("commands"),
+        topChatters=entries("chatters"),
+    )
+
+
+@router.get("/guilds/{guild_id}/leaderboard", response_model=LeaderboardResponse)
+async def guild_leaderboard(
+    guild_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    user_id: int | None = None,
+    radius: int = Query(2, ge=0, le=25),
+) -> LeaderboardResponse:
+    if not leaderboards.ready:
+        raise HTTPException(status_code=503, detail="Leaderboard is still loading.")
+    index = leaderboards.get(guild_id)
+    if index is None:
+        return LeaderboardResponse(total=0, entries=[])
+    guild = bot_manager.get_guild(guild_id)
+
+    def entry(rank: int, member_id: int, xp: int) -> LeaderboardEntry:
+        member = guild.get_member(member_id) if guild is not None else None
+        return LeaderboardEntry(
+            rank=rank + 1,
+            userId=str(member_id),
+            name=member.display_name if member is not None else str(member_id),
+            xp=xp,
+            level=level_for_xp(xp),
+        )
+
+    response = LeaderboardResponse(
+        total=len(index),
+        entries=[entry(*row) for row in index.slice(offset, limit)],
+    )
+    if user_id is not None:
+        rank = index.rank(user_id)
+        if rank is not None:
+            response.member = entry(rank, user_id, index.score(user_id) or 0)
+            response.around = [entry(*row) for row in index.around(user_id, radius)]
+    return response
+
+
+def _active_users_card(db: Session, today) -> DashboardCard:
+    # Seven daily all-guild sketches: DAU is today's, WAU their union.
+    daily, weekly = active_users.active_users(db, today, 7)
+    dau, previous = daily[-1][1], daily[-2][1]
+    return DashboardCard(label="Active Users (Day / Week)", value=f"{dau} / {weekly}", change=f"{dau - previous:+d}", icon="Users")
+
+
+def _day_start(day) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _ts_bound(moment: datetime) -> str:
+    # Stored timestamps are "%Y-%m-%d %H:%M:%S" text, which sorts like the
+    # time itself. They have no fractional part, so ts >= moment is the same
+    # as ts >= the next whole second.
+    if moment.microsecond:
+        moment = moment.replace(microsecond=0) + timedelta(seconds=1)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
 @router.get("/dashboard", response_model=DashboardResponse)
-async def dashboard(db: Session = Depends(get_db)) -> DashboardResponse:
+async def dashboard(db: Session = Depends(get_read_db)) -> DashboardResponse:
     bot = await bot_info()
     guilds = list(bot_manager.guilds())
     total_servers = len(guilds)
     total_users = sum(g.member_count or 0 for g in guilds)
-    today = datetime.now(timezone.utc).date()
-    command_rows = db.query(LogEntryModel).filter(LogEntryModel.action == "command").all()
-    change_rows = db.query(LogEntryModel).filter(LogEntryModel.action.in_(["join", "leave", "server_join", "server_leave"]))
-    change_rows = change_rows.all()
-    commands_today = 0
-    commands_yesterday = 0
-    user_change = 0
-    server_change = 0
-    change_cutoff = datetime.now(timezone.utc) - timedelta(days=1)
-    for row in command_rows:
-        try:
-            ts = datetime.strptime(row.timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        if ts.date() == today:
-            commands_today += 1
-        elif ts.date() == today - timedelta(days=1):
-            commands_yesterday += 1
-
-    command_change = commands_today - commands_yesterday
-    command_change_str = f"{command_change:+d}"
-
-    for row in change_rows:
-        try:
-            ts = datetime.strptime(row.timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        if ts < change_cutoff:
-            continue
-        if row.action == "join":
-            user_change += 1
-        elif row.action == "leave":
-            user_change -= 1
-        elif row.action == "server_join":
-            server_change += 1
-        elif row.action == "server_leave":
-            server_change -= 1
-
-    server_change_str = f"{server_change:+d}"
-    user_change_str = f"{user_change:+d}"
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    # Both aggregates are index range scans on (action, timestamp) and return
+    # at most seven and four rows, however large bot_logs is.
+    day = func.substr(LogEntryModel.timestamp, 1, 10)
+    per_day = dict(
+        db.query(day, func.count())
+        .filter(
+            LogEntryModel.action == "command",
+            LogEntryModel.timestamp >= _ts_bound(_day_start(today - timedelta(days=6))),
+            LogEntryModel.timestamp < _ts_bound(_day_start(today + timedelta(days=1))),
+            WELL_FORMED_TIMESTAMP,
+        )
+        .group_by(day)
+        .all()
+    )
+    changes = dict(
+        db.query(LogEntryModel.action, func.count())
+        .filter(
+            LogEntryModel.action.in_(["join", "leave", "server_join", "server_leave"]),
+            LogEntryModel.timestamp >= _ts_bound(now - timedelta(days=1)),
+            WELL_FORMED_TIMESTAMP,
+        )
+        .group_by(LogEntryModel.action)
+        .all()
+    )
+    commands_today = per_day.get(today.isoformat(), 0)
+    commands_yesterday = per_day.get((today - timedelta(days=1)).isoformat(), 0)
+    command_change_str = f"{commands_today - commands_yesterday:+d}"
+    server_change_str = f"{changes.get('server_join', 0) - changes.get('server_leave', 0):+d}"
+    user_change_str = f"{changes.get('join', 0) - changes.get('leave', 0):+d}"
 
     stats = [
         DashboardCard(label="Total Servers", value=str(total_servers), change=server_change_str, icon="Server"),
         DashboardCard(label="Total Users", value=str(total_users), change=user_change_str, icon="Users"),
         DashboardCard(label="Commands Today", value=str(commands_today), change=command_change_str, icon="Terminal"),
         DashboardCard(label="Voice Sessions", value="0", change="+0", icon="Headphones"),
+        _active_users_card(db, today),
     ]
     months = ["Aug", "Sep", "Oct", "Nov", "Dec", "Jan", "Feb"]
     server_growth = [ServerGrowthPoint(month=m, servers=total_servers) for m in months]
-    today = datetime.now(timezone.utc).date()
-    day_labels = []
-    day_counts = []
-    for offset in range(6, -1, -1):
-        day = today - timedelta(days=offset)
-        day_labels.append(day.strftime("%a"))
-        day_counts.append(0)
-
-    log_rows = db.query(LogEntryModel).filter(LogEntryModel.action == "command").all()
-    for row in log_rows:
-        try:
-            ts = datetime.strptime(row.timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        day = ts.date()
-        if day < today - timedelta(days=6) or day > today:
-            continue
-        idx = (day - (today - timedelta(days=6))).days
-        if 0 <= idx < len(day_counts):
-            day_counts[idx] += 1
+    days = [today - timedelta(days=offset) for offset in range(6, -1, -1)]
+    day_labels = [d.strftime("%a") for d in days]
+    day_counts = [per_day.get(d.isoformat(), 0) for d in days]
 
     command_usage = [CommandUsagePoint(day=label, commands=count) for label, count in zip(day_labels, day_counts)]
     log_rows = db.query(LogEntryModel).order_by(LogEntryModel.timestamp.desc()).limit(8).all()
@@ -489,9 +667,50 @@ async def server_settings_update(guild_id: int, payload: ServerSettings, db: Ses
         row.language = payload.language
         row.modules = payload.modules
     db.commit()
+    prefix_store.set(guild_id, row.prefix)
     return ServerSettings(prefix=row.prefix, language=row.language, modules=row.modules)
 
 
+def _guild_settings_view(db: Session, row: GuildSettingsOverrideModel | None) -> GuildSettingsView:
+    overrides = {section: (getattr(row, section) or {}) if row else {} for section in OVERRIDABLE_SECTIONS}
+    defaults = bot_manager.guild_configs.defaults
+    existing = db.query(BotSettingsModel).first()
+    if existing is not None:
+        defaults = {section: getattr(existing, section) for section in BotSettings.model_fields}
+    effective = merge_sections(defaults, overrides)
+    return GuildSettingsView(overrides=GuildSettingsOverrides(**overrides), effective=BotSettings(**effective))
+
+
+@router.get("/servers/{guild_id}/overrides", response_model=GuildSettingsView)
+async def guild_overrides_view(guild_id: int, db: Session = Depends(get_db)) -> GuildSettingsView:
+    return _guild_settings_view(db, db.get(GuildSettingsOverrideModel, guild_id))
+
+
+@router.post("/servers/{guild_id}/overrides", response_model=GuildSettingsView)
+async def guild_overrides_update(
+    guild_id: int, payload: GuildSettingsOverrides, db: Session = Depends(get_db)
+) -> GuildSettingsView:
+    row = db.get(GuildSettingsOverrideModel, guild_id)
+    if row is None:
+        row = GuildSettingsOverrideModel(guild_id=guild_id)
+        db.add(row)
+    for section in OVERRIDABLE_SECTIONS:
+        setattr(row, section, getattr(payload, section))
+    db.commit()
+    bot_manager.guild_configs.invalidate(guild_id)
+    return _guild_settings_view(db, row)
+
+
+@router.delete("/servers/{guild_id}/overrides", response_model=GuildSettingsView)
+async def guild_overrides_delete(guild_id: int, db: Session = Depends(get_db)) -> GuildSettingsView:
+    row = db.get(GuildSettingsOverrideModel, guild_id)
+    if row is not None:
+        db.delete(row)
+        db.commit()
+    bot_manager.guild_configs.invalidate(guild_id)
+    return _guild_settings_view(db, None)
+
+
 @router.get("/members", response_model=List[MemberItem])
 async def members() -> List[MemberItem]:
     guild = await _get_primary_guild()
@@ -588,7 +807,7 @@ async def commands(db: Session = Depends(get_db)) -> List[CommandItem]:
 
 
 @router.get("/analytics", response_model=AnalyticsData)
-async def analytics(range_param: str = "7d", db: Session = Depends(get_db)) -> AnalyticsData:
+async def analytics(range_param: str = "7d", db: Session = Depends(get_read_db)) -> AnalyticsData:
     now = datetime.now(timezone.utc)
     duration = timedelta(days=7)
     if range_param.endswith("d") and range_param[:-1].isdigit():
@@ -597,23 +816,25 @@ async def analytics(range_param: str = "7d", db: Session = Depends(get_db)) -> A
         duration = timedelta(hours=int(range_param[:-1]))
     start_time = now - duration
 
-    rows = db.query(LogEntryModel).filter(LogEntryModel.action == "command").all()
-    recent_rows = []
-    for row in rows:
-        try:
-            ts = datetime.strptime(row.timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        if ts >= start_time:
-            recent_rows.append((row, ts))
-
-    server_counts: dict[str, int] = {}
+    recent = (
+        LogEntryModel.action == "command",
+        LogEntryModel.timestamp >= _ts_bound(start_time),
+        WELL_FORMED_TIMESTAMP,
+    )
+    hour = func.substr(LogEntryModel.timestamp, 12, 2)
     hour_counts = {h: 0 for h in range(0, 24, 2)}
-    for row, ts in recent_rows:
-        if row.server:
-            server_counts[row.server] = server_counts.get(row.server, 0) + 1
-        bucket = (ts.hour // 2) * 2
-        hour_counts[bucket] = hour_counts.get(bucket, 0) + 1
+    for value, count in db.query(hour, func.count()).filter(*recent).group_by(hour).all():
+        if value.isdigit() and int(value) < 24:
+            hour_counts[(int(value) // 2) * 2] += count
+    commands_used = func.count().label("commands")
+    server_counts = (
+        db.query(LogEntryModel.server, commands_used)
+        .filter(*recent, LogEntryModel.server != "")
+        .group_by(LogEntryModel.server)
+        .order_by(commands_used.desc(), LogEntryModel.server)
+        .limit(5)
+        .all()
+    )
 
     command_rows = db.query(CommandModel).all()
     categories = {"music": 0, "fun": 0, "moderation": 0, "utility": 0}
@@ -628,10 +849,7 @@ async def analytics(range_param: str = "7d", db: Session = Depends(get_db)) -> A
         {"name": "Utility", "value": categories.get("utility", 0), "fill": "hsl(var(--chart-4))"},
     ]
 
-    top_servers = [
-        {"name": name, "commands": count}
-        for name, count in sorted(server_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    ]
+    top_servers = [{"name": name, "commands": count} for name, count in server_counts]
     if not top_servers:
         guilds = list(bot_manager.guilds())
         top_servers = [
@@ -640,35 +858,193 @@ async def analytics(range_param: str = "7d", db: Session = Depends(get_db)) -> A
         ]
 
     peak_hours = [{"hour": f"{h:02d}:00", "users": hour_counts.get(h, 0)} for h in range(0, 24, 2)]
-    top_users = []
+    since = start_time.timestamp()
+    top_users = [{"name": h.label, "commands": h.count} for h in activity_tracker.top("command_users", 5, since)]
+    top_commands = [{"name": h.label, "commands": h.count} for h in activity_tracker.top("commands", 5, since)]
 
     return AnalyticsData(
         commandBreakdown=command_breakdown,
         peakHours=peak_hours,
         topServers=top_servers,
         topUsers=top_users,
+        topCommands=top_commands,
+    )
+
+
+@router.get("/analytics/active-users", response_model=ActiveUsersResponse)
+def analytics_active_users(
+    days: int = Query(7, ge=1, le=366),
+    guild_id: List[int] | None = Query(None),
+    db: Session = Depends(get_read_db),
+) -> ActiveUsersResponse:
+    # Estimates from HyperLogLog sketches (about 1.6% standard error); several
+    # guild_id values give distinct users across those guilds combined.
+    daily, total = active_users.active_users(db, datetime.now(timezone.utc).date(), days, guild_id)
+    return ActiveUsersResponse(
+        days=[ActiveUsersDay(day=day, users=count) for day, count in daily],
+        distinctUsers=total,
+    )
+
+
+def _parse_moment(value: str, name: str) -> datetime:
+    try:
+        moment = datetime.fromisoformat(value)
+        moment = moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"Invalid {name} timestamp")
+    if moment < EARLIEST:
+        raise HTTPException(status_code=400, detail=f"{name} must not be before 1970")
+    return moment
+
+
+@router.get("/analytics/timeseries", response_model=TimeSeriesResponse)
+def analytics_timeseries(
+    range_param: str = "7d",
+    start: str | None = None,
+    end: str | None = None,
+    resolution: str | None = None,
+    points: int = Query(300, ge=3, le=5000),
+    action: List[str] | None = Query(None),
+    server: str | None = None,
+    db: Session = Depends(get_read_db),
+) -> TimeSeriesResponse:
+    # Plain def: FastAPI runs it on the threadpool, so a long range never
+    # blocks the event loop.
+    max_span = settings.timeseries_max_span_days * 86400
+    too_long = f"range must not exceed {settings.timeseries_max_span_days:g} days"
+    end_at = _parse_moment(end, "end") if end else datetime.now(timezone.utc)
+    if start:
+        start_at = _parse_moment(start, "start")
+    else:
+        span = parse_duration(range_param)
+        if span is None:
+            raise HTTPException(status_code=400, detail="Invalid range")
+        if span > max_span:
+            raise HTTPException(status_code=400, detail=too_long)
+        start_at = end_at - timedelta(seconds=span)
+        if start_at < EARLIEST:
+            raise HTTPException(status_code=400, detail="start must not be before 1970")
+    if start_at >= end_at:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end_at - start_at).total_seconds() > max_span:
+        raise HTTPException(status_code=400, detail=too_long)
+    requested = parse_duration(resolution) if resolution else None
+    if resolution and not requested:
+        raise HTTPException(status_code=400, detail="Invalid resolution")
+    width = choose_bucket((end_at - start_at).total_seconds(), settings.timeseries_max_buckets, requested)
+    series = action_series(db, start_at, end_at, width, points, actions=action, server=server)
+    return TimeSeriesResponse(
+        start=start_at.strftime("%Y-%m-%d %H:%M:%S"),
+        end=end_at.strftime("%Y-%m-%d %H:%M:%S"),
+        bucketSeconds=width,
+        series=[
+            ActionSeries(
+                action=item.action,
+                total=item.total,
+                points=[
+                    SeriesPoint(time=format_time(t), value=int(v)) for t, v in zip(item.times.tolist(), item.values.tolist())
+                ],
+            )
+            for item in series
+        ],
+    )
+
+
+def _log_filters(query, start: str | None, end: str | None, action: str | None, server: str | None):
+    if start:
+        query = query.filter(LogEntryModel.timestamp >= start)
+    if end:
+        query = query.filter(LogEntryModel.timestamp < end)
+    if action:
+        query = query.filter(LogEntryModel.action == action)
+    if server:
+        query = query.filter(LogEntryModel.server == server)
+    return query
+
+
+def _log_item(row) -> LogItem:
+    if isinstance(row, dict):
+        return LogItem(**row)
+    return LogItem(
+        id=row.id,
+        timestamp=row.timestamp,
+        server=row.server,
+        user=row.user,
+        action=row.action,
+        details=row.details,
+        level=row.level,
     )
 
 
 @router.get("/logs", response_model=List[LogItem])
-async def logs(db: Session = Depends(get_db)) -> List[LogItem]:
-    rows = db.query(LogEntryModel).order_by(LogEntryModel.timestamp.desc()).limit(100).all()
-    return [
-        LogItem(
-            id=row.id,
-            timestamp=row.timestamp,
-            server=row.server,
-            user=row.user,
-            action=row.action,
-            details=row.details,
-            level=row.level,
+async def logs(
+    include_archive: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+    action: str | None = None,
+    server: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+) -> List[LogItem]:
+    query = _log_filters(db.query(LogEntryModel), start, end, action, server)
+    items = [_log_item(row) for row in query.order_by(LogEntryModel.timestamp.desc()).limit(limit).all()]
+    if include_archive and len(items) < limit:
+        # Archived rows are all older than what's left in the table.
+        archived = await asyncio.to_thread(
+            lambda: list(
+                archive_reader.scan(ArchiveQuery(start, end, action, server), newest_first=True, limit=limit - len(items))
+            )
         )
-        for row in rows
-    ]
+        items.extend(_log_item(row) for row in archived)
+    return items
+
+
+@router.get("/logs/export")
+def export_logs(
+    include_archive: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+    action: str | None = None,
+    server: str | None = None,
+) -> StreamingResponse:
+    columns = ("id", "timestamp", "server", "user", "action", "details", "level")
+
+    def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush() -> str:
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        writer.writerow(columns)
+        if include_archive:
+            for record in archive_reader.scan(ArchiveQuery(start, end, action, server), newest_first=False):
+                writer.writerow([record[c] for c in columns])
+                if buffer.tell() > 65536:
+                    yield flush()
+        db = ReadSessionLocal()
+        try:
+            query = _log_filters(db.query(LogEntryModel), start, end, action, server)
+            for row in query.order_by(LogEntryModel.timestamp, LogEntryModel.id).yield_per(2000):
+                writer.writerow([getattr(row, c) for c in columns])
+                if buffer.tell() > 65536:
+                    yield flush()
+        finally:
+            db.close()
+        yield flush()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="bot_logs.csv"'},
+    )
 
 
 @router.get("/notifications", response_model=List[NotificationItem])
-async def notifications(db: Session = Depends(get_db)) -> List[NotificationItem]:
+async def notifications(db: Session = Depends(get_read_db)) -> List[NotificationItem]:
     rows = db.query(LogEntryModel).order_by(LogEntryModel.timestamp.desc()).limit(12).all()
     title_map = {
         "command": "Command used",
@@ -786,6 +1162,7 @@ async def command_toggle(name: str, payload: CommandToggleRequest, db: Session =
         raise HTTPException(status_code=404, detail="Command not found")
     row.enabled = payload.enabled
     db.commit()
+    bot_manager.commands_changed()
     return {"status": "ok", "name": name, "enabled": payload.enabled}
 
 
@@ -805,6 +1182,7 @@ async def command_create(payload: CommandCreateRequest, db: Session = Depends(ge
     )
     db.add(row)
     db.commit()
+    bot_manager.commands_changed()
     return {"status": "created", "name": payload.name}
 
 
@@ -841,28 +1219,34 @@ async def get_config() -> dict:
 
 @router.get("/ai/intents", response_model=List[AiIntent])
 async def get_ai_intents() -> List[AiIntent]:
-    return AI_INTENTS
+    snapshot = await intent_store.get_snapshot()
+    return [
+        AiIntent(id=intent.id, label=intent.label, enabled=intent.enabled, response=intent.response)
+        for intent in snapshot.intents
+    ]
 
 
 @router.post("/ai/intents")
 async def save_ai_intents(payload: AiIntentPayload) -> dict:
-    AI_INTENTS.clear()
-    AI_INTENTS.extend(payload.intents)
-    return {"status": "saved", "count": len(AI_INTENTS)}
+    snapshot = await intent_store.save(
+        IntentRecord(id=intent.id, label=intent.label, enabled=intent.enabled, response=intent.response)
+        for intent in payload.intents
+    )
+    return {"status": "saved", "count": len(snapshot.intents), "version": snapshot.version}
 
 
 @router.post("/ai/generate")
 async def generate_ai_response(payload: AiGenerateRequest) -> dict:
-    intents = AI_INTENTS
+    snapshot = await intent_store.get_snapshot()
     try:
-        groq_response = await _generate_groq_response(payload.prompt, intents, payload.intent_id)
+        groq_response = await _generate_groq_response(payload.prompt, snapshot, payload.intent_id)
     except httpx.HTTPError:
         groq_response = None
 
     if groq_response:
         return {"response": groq_response}
 
-    chosen = _pick_intent(intents, payload.intent_id)
+    chosen = snapshot.pick(payload.intent_id)
     canned = chosen.response if chosen else "Thanks for your message! We'll get back to you soon."
     response = f"{canned} (Suggested for: {payload.prompt})"
     return {"response": response}
@@ -894,36 +1278,8 @@ class UserResponse(BaseModel):
     email: str
 
 
-# JWT Secret (in production, use environment variable)
-JWT_SECRET = getattr(settings, "secret_key", "your-secret-key-change-in-production")
-
-
-def create_token(user_id: int, email: str) -> str:
-    """Create a simple JWT token"""
-    import base64
-    import json
-    
-    payload = {
-        "user_id": user_id,
-        "email": email,
-        "exp": datetime.now(timezone.utc).timestamp() + (30 * 24 * 60 * 60)  # 30 days
-    }
-    token = base64.b64encode(json.dumps(payload).encode()).decode()
-    return token
-
-
-def verify_token(token: str) -> dict | None:
-    """Verify JWT token"""
-    import base64
-    import json
-    
-    try:
-        payload = json.loads(base64.b64decode(token.encode()).decode())
-        if payload.get("exp", 0) < datetime.now(timezone.utc).timestamp():
-            return None
-        return payload
-    except:
-        return None
+class UserActiveRequest(BaseModel):
+    active: bool
 
 
 @router.post("/auth/register", response_model=AuthResponse)
@@ -939,7 +1295,10 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> A
         return AuthResponse(success=False, error="Username already taken")
     
     # Hash password
-    password_hash = bcrypt.hashpw(payload.password.encode(), bcrypt.gensalt()).decode()
+    try:
+        password_hash = await password_hasher.hash(payload.password)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
     
     # Create user
     user = UserModel(
@@ -952,6 +1311,7 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> A
     db.add(user)
     db.commit()
     db.refresh(user)
+    remember_user(user)
     
     # Create token
     token = create_token(user.id, user.email)
@@ -971,12 +1331,25 @@ async def login(payload: LoginRequest, db: Session = Depends(get_db)) -> AuthRes
         return AuthResponse(success=False, error="Invalid credentials")
     
     # Verify password
-    if not bcrypt.checkpw(payload.password.encode(), user.password_hash.encode()):
+    try:
+        valid = await password_hasher.verify(payload.password, user.password_hash)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    if not valid:
         return AuthResponse(success=False, error="Invalid credentials")
     
     if not user.is_active:
         return AuthResponse(success=False, error="Account is disabled")
     
+    # Upgrade the stored hash if the configured cost factor changed
+    if password_hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await password_hasher.hash(payload.password)
+            db.commit()
+        except PasswordHasherBusy:
+            pass
+    remember_user(user)
+    
     # Create token
     token = create_token(user.id, user.email)
     
@@ -988,19 +1361,25 @@ async def login(payload: LoginRequest, db: Session = Depends(get_db)) -> AuthRes
 
 
 @router.get("/auth/me", response_model=AuthResponse)
-async def get_current_user(token: str, db: Session = Depends(get_db)) -> AuthResponse:
-    # Verify token
-    payload = verify_token(token)
-    if not payload:
-        return AuthResponse(success=False, error="Invalid or expired token")
-    
-    # Find user
-    user = db.query(UserModel).filter(UserModel.id == payload.get("user_id")).first()
-    if not user:
-        return AuthResponse(success=False, error="User not found")
-    
-    return AuthResponse(
-        success=True,
-        token=token,
-        user={"id": user.id, "username": user.username, "email": user.email}
-    )
+async def get_current_user(
+    user: CachedUser = Depends(require_user), token: str | None = Depends(request_token)
+) -> AuthResponse:
+    return AuthResponse(success=True, token=token, user=user.as_dict())
+
+
+@router.post("/auth/users/{user_id}/active", response_model=UserResponse)
+async def set_user_active(
+    user_id: int,
+    payload: UserActiveRequest,
+    admin: CachedUser = Depends(require_admin),
+    db: Session = Depends(get_db),
+) -> UserResponse:
+    if user_id == admin.id and not payload.active:
+        raise HTTPException(status_code=400, detail="You cannot deactivate your own account")
+    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.is_active = payload.active
+    db.commit()
+    user_cache.invalidate(user_id)
+    return UserResponse(id=user.id, username=user.username, email=user.email)
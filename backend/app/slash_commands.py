@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+from typing import Awaitable, Callable, Iterable
+
+import discord
+from discord import app_commands
+
+from .commands import CommandCatalog
+from .config import settings
+from .database import SessionLocal
+from .metrics import REGISTRY
+from .models import AppCommandSyncModel
+
+
+GLOBAL_SCOPE = 0
+SLASH_SYNCS = REGISTRY.counter("slash_command_syncs_total", "Application command sync decisions per scope.", ("result",))
+
+CommandHandler = Callable[[discord.Interaction, str], Awaitable[None]]
+
+
+def payload_hash(payload: list[dict]) -> str:
+    canonical = json.dumps(sorted(payload, key=lambda c: c["name"]), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _load_hashes_sync() -> dict[int, str]:
+    session = SessionLocal()
+    try:
+        return {row.scope_id: row.hash for row in session.query(AppCommandSyncModel).all()}
+    finally:
+        session.close()
+
+
+def _store_hashes_sync(hashes: dict[int, str]) -> None:
+    session = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        for scope_id, digest in hashes.items():
+            row = session.get(AppCommandSyncModel, scope_id)
+            if row is None:
+                session.add(AppCommandSyncModel(scope_id=scope_id, hash=digest, synced_at=now))
+            else:
+                row.hash = digest
+                row.synced_at = now
+        session.commit()
+    finally:
+        session.close()
+
+
+class SlashCommandSync:
+    def __init__(self, client: discord.Client, handler: CommandHandler) -> None:
+        self.client = client
+        self.tree = app_commands.CommandTree(client)
+        self._handler = handler
+        self._lock = asyncio.Lock()
+        self._pending: asyncio.Task[None] | None = None
+        self._pending_guilds: set[int] | None = set()
+
+    def _callback(self, name: str):
+        async def callback(interaction: discord.Interaction) -> None:
+            await self._handler(interaction, name)
+
+        return callback
+
+    def build(self, catalog: CommandCatalog) -> list[dict]:
+        self.tree.clear_commands(guild=None)
+        for spec in catalog.commands.values():
+            if not spec.enabled or not spec.response:
+                continue
+            description = spec.response.strip().splitlines()[0][:100] if spec.response.strip() else "Custom command"
+            try:
+                command = app_commands.Command(name=spec.name, description=description, callback=self._callback(spec.name))
+                self.tree.add_command(command)
+            except (TypeError, ValueError, app_commands.AppCommandError):
+                # Prefix-only names (uppercase, spaces, too long) can't be slash commands.
+                logging.warning("Skipping command %r for slash registration", spec.name)
+        return [command.to_dict(self.tree) for command in self.tree.get_commands()]
+
+    def _scopes(self, guild_ids: Iterable[int] | None) -> list[int]:
+        if settings.app_commands_scope == "global":
+            return [GLOBAL_SCOPE]
+        # Every guild gets the same command set, so a catalog edit changes
+        # every guild's hash: in guild scope one toggle costs one upsert per
+        # guild (rate-limited, serial). Global scope is a single call and is
+        # the better fit for bots in more than a handful of guilds.
+        if guild_ids is not None:
+            return list(guild_ids)
+        return [guild.id for guild in self.client.guilds]
+
+    async def sync(self, catalog: CommandCatalog, guild_ids: Iterable[int] | None = None) -> dict[str, int]:
+        result = {"synced": 0, "unchanged": 0, "failed": 0}
+        if not settings.app_commands_enabled or not self.client.is_ready():
+            return result
+        async with self._lock:
+            payload = self.build(catalog)
+            digest = payload_hash(payload)
+            stored = await asyncio.to_thread(_load_hashes_sync)
+            application_id = self.client.application_id
+            synced: dict[int, str] = {}
+            for scope_id in self._scopes(guild_ids):
+                if stored.get(scope_id) == digest:
+                    result["unchanged"] += 1
+                    continue
+                try:
+                    if scope_id == GLOBAL_SCOPE:
+                        await self.client.http.bulk_upsert_global_commands(application_id, payload)
+                    else:
+                        await self.client.http.bulk_upsert_guild_commands(application_id, scope_id, payload)
+                except discord.HTTPException:
+                    logging.exception("Failed to sync application commands for scope %s", scope_id)
+                    result["failed"] += 1
+                    continue
+                synced[scope_id] = digest
+                result["synced"] += 1
+            if synced:
+                await asyncio.to_thread(_store_hashes_sync, synced)
+        for key, count in result.items():
+            if count:
+                SLASH_SYNCS.labels(key).inc(count)
+        if result["synced"] or result["failed"]:
+            logging.info("Application command sync: %s", result)
+        return result
+
+    def schedule(self, load_catalog: Callable[[], Awaitable[CommandCatalog]], guild_ids: Iterable[int] | None = None) -> None:
+        # Coalesces bursts of API edits (or guild joins) into one sync.
+        if not settings.app_commands_enabled:
+            return
+        if guild_ids is None:
+            self._pending_guilds = None
+        elif self._pending_guilds is not None:
+            self._pending_guilds.update(guild_ids)
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.get_running_loop().create_task(self._run(load_catalog))
+
+    async def _run(self, load_catalog: Callable[[], Awaitable[CommandCatalog]]) -> None:
+        await asyncio.sleep(settings.app_commands_sync_delay_seconds)
+        guilds, self._pending_guilds = self._pending_guilds, set()
+        try:
+            await self.sync(await load_catalog(), guilds)
+        except Exception:
+            logging.exception("Application command sync failed")
+        # Edits and joins that arrived during the sync saw this task still
+        # running and only recorded their scopes; pick them up now.
+        if self._pending_guilds is None or self._pending_guilds:
+            self._pending = asyncio.get_running_loop().create_task(self._run(load_catalog))
+
+    async def close(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._pending
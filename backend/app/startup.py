@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+import time
+
+from sqlalchemy import inspect, text
+
+from .commands import command_store, prefix_store
+from .config import settings
+from .database import Base, engine, init_db
+from .discord_bot import bot_manager
+from .intents import intent_store
+from .metrics import REGISTRY
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# Databases built by create_all()/create_users_table.py before migrations
+# were tracked have exactly these tables, which is this revision's schema.
+BASELINE_REVISION = "add_users_table"
+BASELINE_TABLES = frozenset({"users", "bot_settings", "bot_logs", "bot_commands", "server_settings"})
+# Module import is the closest thing to process start we can observe.
+PROCESS_STARTED = time.monotonic()
+
+STARTUP_SECONDS = REGISTRY.gauge("startup_seconds", "Time from process start until the app reported ready.")
+STARTUP_STEP_SECONDS = REGISTRY.gauge("startup_step_seconds", "Duration of each startup step.", ("step",))
+APP_READY = REGISTRY.gauge("app_ready", "1 once startup has finished and the app can take traffic.")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    # Logging is already configured by the app; alembic.ini's fileConfig
+    # would reset the root level and silence the app's loggers.
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def expected_heads() -> set[str]:
+    # Reads the migration scripts on disk; no database round-trip.
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+def current_revisions_sync() -> set[str]:
+    with engine.connect() as conn:
+        try:
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+        except Exception:
+            return set()
+
+
+def adopt_unversioned_sync() -> str | None:
+    # Stamps a database that has tables but no alembic_version row with the
+    # revision its tables match, so upgrades start from the right place.
+    tables = set(inspect(engine).get_table_names())
+    if not tables & BASELINE_TABLES:
+        return None
+    newer = set(Base.metadata.tables) - BASELINE_TABLES
+    if newer <= tables:
+        revision = "head"
+    elif not newer & tables:
+        revision = BASELINE_REVISION
+    else:
+        raise SchemaOutOfDate(
+            f"Database has no Alembic revision and only some of {sorted(newer)}; stamp it by hand."
+        )
+    from alembic import command
+
+    command.stamp(_alembic_config(), revision)
+    logging.warning("Adopted unversioned database schema as revision %s", revision)
+    return revision
+
+
+def _upgrade_sync() -> str:
+    # Migrations flagged `heavy = True` rewrite whole tables; on a database
+    # that already holds data they'd keep the app unready for the whole copy,
+    # so startup stops short of them and they run out of band instead.
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    config = _alembic_config()
+    current = current_revisions_sync()
+    if current:
+        script = ScriptDirectory.from_config(config)
+        pending = list(script.iterate_revisions("heads", tuple(current)))
+        heavy = [rev for rev in reversed(pending) if getattr(rev.module, "heavy", False)]
+        if heavy:
+            target = heavy[0].down_revision
+            if target not in current:
+                command.upgrade(config, target)
+            raise SchemaOutOfDate(
+                f"Migration {heavy[0].revision} rewrites existing tables and is not run at startup; "
+                "run `alembic upgrade head` (or run_migration.py) and restart."
+            )
+    command.upgrade(config, "head")
+    return "upgraded"
+
+
+def prepare_schema_sync() -> str:
+    mode = settings.db_schema_mode
+    if mode == "create_all":
+        init_db()
+        return "create_all"
+    if not current_revisions_sync():
+        adopt_unversioned_sync()
+    if mode == "upgrade":
+        return _upgrade_sync()
+    heads = expected_heads()
+    current = current_revisions_sync()
+    if current != heads:
+        raise SchemaOutOfDate(
+            f"Database is at {sorted(current) or 'no revision'}, code expects {sorted(heads)}; run the migrations."
+        )
+    return "current"
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self.ready = False
+        self.checks: dict[str, str] = {}
+        self.steps: dict[str, float] = {}
+        self.time_to_ready: float | None = None
+        self.error: str | None = None
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "checks": dict(self.checks),
+            "stepSeconds": {name: round(value, 4) for name, value in self.steps.items()},
+            "timeToReadySeconds": round(self.time_to_ready, 4) if self.time_to_ready is not None else None,
+            "error": self.error,
+        }
+
+    async def _step(self, name: str, coro) -> None:
+        started = time.monotonic()
+        try:
+            result = await coro
+            self.checks[name] = result if isinstance(result, str) else "ok"
+        except Exception:
+            self.checks[name] = "failed"
+            raise
+        finally:
+            self.steps[name] = time.monotonic() - started
+            STARTUP_STEP_SECONDS.labels(name).set(self.steps[name])
+
+    async def _warm(self, name: str, coro) -> None:
+        try:
+            await self._step(name, coro)
+        except Exception:
+            # A cold cache only costs latency on the first event; keep going.
+            logging.exception("Failed to warm %s", name)
+
+    async def run(self) -> None:
+        try:
+            await self._step("schema", asyncio.to_thread(prepare_schema_sync))
+            await asyncio.gather(
+                self._warm("commands", command_store.get_catalog()),
+                self._warm("prefixes", prefix_store.get_prefixes()),
+                self._warm("settings", bot_manager.refresh_settings()),
+                self._warm("intents", intent_store.get_snapshot()),
+            )
+        except Exception as exc:
+            self.error = str(exc)
+            logging.exception("Startup failed; staying not-ready")
+            return
+        self.time_to_ready = time.monotonic() - PROCESS_STARTED
+        self.ready = True
+        APP_READY.set(1)
+        STARTUP_SECONDS.set(self.time_to_ready)
+        logging.info("Ready in %.3fs (%s)", self.time_to_ready, ", ".join(f"{k}={v:.3f}s" for k, v in self.steps.items()))
+
+
+readiness = Readiness()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import re
+
+import numpy as np
+from sqlalchemy import BigInteger, case, cast, func, literal_column
+from sqlalchemy.orm import Session
+
+from .models import LogEntryModel
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Bucket widths a chart axis can label sensibly, finest first.
+BUCKET_WIDTHS = (60, 300, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 604800)
+# Rows whose text timestamp doesn't parse as TIMESTAMP_FORMAT are skipped by
+# every aggregate, as they were when rows were parsed one by one in Python.
+WELL_FORMED_TIMESTAMP = LogEntryModel.timestamp.regexp_match(
+    r"^[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01]) ([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$"
+)
+# bot_logs.timestamp is compared as text, which only orders correctly for
+# four-digit years; nothing is logged before the epoch anyway.
+EARLIEST = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(s|m|h|d|w)?\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(value: str | None) -> float | None:
+    match = _DURATION.match(value or "")
+    if not match:
+        return None
+    return float(match.group(1)) * _UNIT_SECONDS[(match.group(2) or "s").lower()]
+
+
+def choose_bucket(span: float, max_buckets: int, requested: float | None = None) -> int:
+    # The finest standard width at or above the requested resolution that
+    # keeps the grid under max_buckets; the query returns at most that many
+    # rows per action however long the range is.
+    floor = requested or 0
+    for width in BUCKET_WIDTHS:
+        if width >= floor and span / width <= max_buckets:
+            return width
+    return max(int(requested or 0), int(-(-span // max_buckets)), BUCKET_WIDTHS[-1])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    # Largest-Triangle-Three-Buckets: keep the first and last point and, from
+    # each bucket in between, the point forming the largest triangle with the
+    # previously kept point and the next bucket's average. Bucket averages
+    # and triangle areas are computed as whole-array operations; only the
+    # walk across buckets (one step per output point) is a Python loop.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    edges = 1 + np.arange(threshold - 1, dtype=np.int64) * (n - 2) // (threshold - 2)
+    # Slice off the last point so reduceat's final segment stops before it.
+    sums = np.add.reduceat(y[:-1].astype(np.float64), edges[:-1])
+    xsums = np.add.reduceat(x[:-1].astype(np.float64), edges[:-1])
+    sizes = np.diff(edges)
+    avg_x = np.append(xsums / sizes, x[-1])
+    avg_y = np.append(sums / sizes, y[-1])
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        bx = x[lo:hi]
+        by = y[lo:hi]
+        area = np.abs(
+            (x[anchor] - avg_x[bucket + 1]) * (by - y[anchor]) - (x[anchor] - bx) * (avg_y[bucket + 1] - y[anchor])
+        )
+        anchor = lo + int(np.argmax(area))
+        keep[bucket + 1] = anchor
+    return x[keep], y[keep]
+
+
+@dataclass(frozen=True)
+class Series:
+    action: str
+    times: np.ndarray
+    values: np.ndarray
+    total: int
+
+
+def _int(value: int):
+    return literal_column(str(int(value)), BigInteger)
+
+
+def _field(start: int, length: int):
+    return cast(func.substr(LogEntryModel.timestamp, _int(start), _int(length)), BigInteger)
+
+
+def _bucket_expr(width: int):
+    # Epoch seconds computed from the text fields with integer arithmetic
+    # (days-from-civil), the same on every backend. Casting the column to
+    # TIMESTAMP would abort the whole query on Postgres at the first
+    # malformed row. Constants are inlined rather than bound so the SELECT
+    # and GROUP BY expressions are textually identical, which Postgres
+    # requires.
+    month, day = _field(6, 2), _field(9, 2)
+    year = _field(1, 4) - case((month <= _int(2), _int(1)), else_=_int(0))
+    era = year // _int(400)
+    year_of_era = year - era * _int(400)
+    day_of_year = (_int(153) * ((month + _int(9)) % _int(12)) + _int(2)) // _int(5) + day - _int(1)
+    day_of_era = year_of_era * _int(365) + year_of_era // _int(4) - year_of_era // _int(100) + day_of_year
+    days = era * _int(146097) + day_of_era - _int(719468)
+    seconds = days * _int(86400) + _field(12, 2) * _int(3600) + _field(15, 2) * _int(60) + _field(18, 2)
+    return seconds // _int(width)
+
+
+def action_series(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    width: int,
+    points: int,
+    actions: list[str] | None = None,
+    server: str | None = None,
+) -> list[Series]:
+    first = int(start.timestamp()) // width
+    count = max(1, -(-int(end.timestamp()) // width) - first)
+    bucket = _bucket_expr(width)
+    query = session.query(LogEntryModel.action, bucket, func.count()).filter(
+        LogEntryModel.timestamp >= start.strftime(TIMESTAMP_FORMAT),
+        LogEntryModel.timestamp < end.strftime(TIMESTAMP_FORMAT),
+        WELL_FORMED_TIMESTAMP,
+    )
+    if actions:
+        query = query.filter(LogEntryModel.action.in_(actions))
+    if server:
+        query = query.filter(LogEntryModel.server == server)
+    rows = query.group_by(LogEntryModel.action, bucket).all()
+
+    grids: dict[str, np.ndarray] = {name: np.zeros(count, dtype=np.int64) for name in actions or ()}
+    for action, index, value in rows:
+        offset = int(index) - first
+        if 0 <= offset < count:
+            grid = grids.get(action)
+            if grid is None:
+                grid = grids[action] = np.zeros(count, dtype=np.int64)
+            grid[offset] += value
+    times = (first + np.arange(count, dtype=np.int64)) * width
+    series = []
+    for action in sorted(grids):
+        grid = grids[action]
+        x, y = lttb(times, grid, points)
+        series.append(Series(action=action, times=x, values=y, total=int(grid.sum())))
+    return series
+
+
+def format_time(epoch: int) -> str:
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).strftime(TIMESTAMP_FORMAT)
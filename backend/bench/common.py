@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable
+
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def use_database(url: str | None) -> str:
+    # app.database builds its engine at import time, so the URL has to be in the
+    # environment before anything under app/ is imported.
+    if "app.database" in sys.modules:
+        raise RuntimeError("use_database() must run before the app package is imported.")
+    if not url:
+        fd, path = tempfile.mkstemp(prefix="bench-", suffix=".db")
+        os.close(fd)
+        atexit.register(_remove_database, path)
+        url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DISCORD_AUTOSTART", "false")
+    if url.startswith("sqlite"):
+        _enable_sqlite_jsonb()
+
+    from app.database import Base, engine
+    from app import models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    return url
+
+
+def _remove_database(path: str) -> None:
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _enable_sqlite_jsonb() -> None:
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+        return "JSON"
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples_ns: list[int]) -> dict:
+    values = sorted(samples_ns)
+    count = len(values)
+    total = sum(values)
+    return {
+        "count": count,
+        "mean_us": round(total / count / 1000, 2) if count else 0.0,
+        "p50_us": round(percentile(values, 50) / 1000, 2),
+        "p99_us": round(percentile(values, 99) / 1000, 2),
+        "max_us": round(values[-1] / 1000, 2) if count else 0.0,
+    }
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[int]] = {}
+
+    def record(self, stage: str, elapsed_ns: int) -> None:
+        self.samples.setdefault(stage, []).append(elapsed_ns)
+
+    def wrap_sync(self, target: Any, attr: str, stage: str | None = None) -> None:
+        original = getattr(target, attr)
+        name = stage or attr.strip("_")
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter_ns() - started)
+
+        setattr(target, attr, timed)
+
+    def wrap_async(self, target: Any, attr: str, stage: str | None = None) -> None:
+        original: Callable[..., Awaitable[Any]] = getattr(target, attr)
+        name = stage or attr.strip("_")
+
+        async def timed(*args, **kwargs):
+            started = time.perf_counter_ns()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter_ns() - started)
+
+        setattr(target, attr, timed)
+
+    def report(self) -> dict[str, dict]:
+        return {stage: summarize(values) for stage, values in sorted(self.samples.items())}
+
+
+def environment_info(database_url: str) -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": database_url.split(":", 1)[0],
+    }
+
+
+def load_baseline(name: str) -> dict | None:
+    path = BASELINE_DIR / f"{name}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_baseline(name: str, report: dict) -> Path:
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = BASELINE_DIR / f"{name}.json"
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def compare_stages(current: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    regressions = []
+    for stage, stats in current.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for metric in ("p50_us", "p99_us"):
+            before = previous.get(metric) or 0.0
+            after = stats.get(metric) or 0.0
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append(f"{stage}.{metric}: {before:.2f} -> {after:.2f} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_stage_table(stages: dict[str, dict], baseline: dict[str, dict] | None = None) -> None:
+    print(f"{'stage':<28}{'count':>8}{'p50 us':>12}{'p99 us':>12}{'mean us':>12}{'base p50':>12}")
+    for stage, stats in stages.items():
+        base = (baseline or {}).get(stage, {}).get("p50_us")
+        base_str = f"{base:.2f}" if isinstance(base, (int, float)) else "-"
+        print(
+            f"{stage:<28}{stats['count']:>8}{stats['p50_us']:>12.2f}{stats['p99_us']:>12.2f}"
+            f"{stats['mean_us']:>12.2f}{base_str:>12}"
+        )
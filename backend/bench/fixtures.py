@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import random
+from typing import Iterator
+
+
+WORDS = (
+    "hey anyone around tonight the raid starts at nine bring potions and food "
+    "gg that was close lol does this bot support music queue patch notes dropped "
+    "who wants to duo ranked later my internet is dying again"
+).split()
+BLACKLIST = ["scamlink", "freenitro", "badword"]
+UNICODE_EMOJIS = ["\U0001F600", "\U0001F525", "\U0001F44D", "\U0001F389", "\U0001F680", "\U0001F914"]
+CUSTOM_EMOJIS = ["<:pepe:123456789012345678>", "<a:party:223456789012345678>", "<:kek:323456789012345678>"]
+COMMANDS = ["help", "ping", "rules", "rank", "play", "unknown"]
+
+CONTENT_MIX = (
+    ("plain", 0.50),
+    ("command", 0.20),
+    ("link", 0.08),
+    ("emoji", 0.07),
+    ("mentions", 0.05),
+    ("caps", 0.05),
+    ("blacklist", 0.05),
+)
+
+BENCH_AUTOMOD = {
+    "spamFilter": True,
+    "linkFilter": True,
+    "capsFilter": True,
+    "wordBlacklist": BLACKLIST,
+    "maxMentions": 5,
+    "maxEmojis": 10,
+}
+
+
+@dataclass(eq=False)
+class FakeUser:
+    id: int
+    display_name: str
+    bot: bool = False
+    name: str = ""
+
+
+@dataclass(eq=False)
+class FakeMember(FakeUser):
+    guild: object | None = None
+    dms: int = 0
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def send(self, content: str, **_kwargs) -> None:
+        self.dms += 1
+
+
+@dataclass(eq=False)
+class FakeRole:
+    id: int
+    name: str
+
+
+@dataclass(eq=False)
+class FakeGuild:
+    id: int
+    name: str
+    member_count: int = 100
+    text_channels: list = field(default_factory=list)
+    me: object | None = None
+
+    def get_channel(self, channel_id: int):
+        return next((c for c in self.text_channels if c.id == channel_id), None)
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str, guild: FakeGuild | None = None) -> None:
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.sent = 0
+        self.bulk_deletes = 0
+
+    async def send(self, content: str, **_kwargs) -> None:
+        self.sent += 1
+
+    async def delete_messages(self, messages, **_kwargs) -> None:
+        self.bulk_deletes += 1
+        for message in messages:
+            message.deleted = True
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, content: str, author: FakeUser, guild: FakeGuild, channel: FakeChannel,
+                 mentions: list | None = None, role_mentions: list | None = None, kind: str = "plain") -> None:
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.mentions = mentions or []
+        self.role_mentions = role_mentions or []
+        self.kind = kind
+        self.created_at = datetime.now(timezone.utc)
+        self.deleted = False
+
+    async def delete(self) -> None:
+        self.deleted = True
+
+
+class MessageFactory:
+    def __init__(self, seed: int = 1, guilds: int = 20, users_per_guild: int = 200, prefix: str = "!") -> None:
+        self._rng = random.Random(seed)
+        self.prefix = prefix
+        self.guilds = [FakeGuild(id=10_000 + i, name=f"Guild {i}") for i in range(guilds)]
+        self.channels = {}
+        for guild in self.guilds:
+            channels = [FakeChannel(guild.id * 10 + c, f"channel-{c}", guild) for c in range(3)]
+            guild.text_channels = channels
+            self.channels[guild.id] = channels
+        self.users = {
+            guild.id: [FakeUser(id=guild.id * 1000 + u, display_name=f"user{u}", name=f"user{u}") for u in range(users_per_guild)]
+            for guild in self.guilds
+        }
+        self.roles = [FakeRole(id=900 + r, name=f"role{r}") for r in range(4)]
+        self._kinds = [kind for kind, _ in CONTENT_MIX]
+        self._weights = [weight for _, weight in CONTENT_MIX]
+        self._next_id = 1
+
+    def _sentence(self, low: int = 3, high: int = 14) -> str:
+        return " ".join(self._rng.choice(WORDS) for _ in range(self._rng.randint(low, high)))
+
+    def message(self, kind: str | None = None) -> FakeMessage:
+        rng = self._rng
+        kind = kind or rng.choices(self._kinds, weights=self._weights)[0]
+        guild = rng.choice(self.guilds)
+        channel = rng.choice(self.channels[guild.id])
+        author = rng.choice(self.users[guild.id])
+        mentions: list = []
+        role_mentions: list = []
+        if kind == "command":
+            args = self._sentence(0, 3)
+            content = f"{self.prefix}{rng.choice(COMMANDS)} {args}".strip()
+        elif kind == "link":
+            content = f"{self._sentence()} https://example.com/{rng.randint(1, 10_000)}"
+        elif kind == "emoji":
+            pool = UNICODE_EMOJIS + CUSTOM_EMOJIS
+            content = self._sentence() + " " + " ".join(rng.choice(pool) for _ in range(rng.randint(2, 16)))
+        elif kind == "mentions":
+            mentions = rng.sample(self.users[guild.id], rng.randint(1, 8))
+            role_mentions = rng.sample(self.roles, rng.randint(0, 2))
+            content = " ".join(f"<@{u.id}>" for u in mentions) + " " + self._sentence()
+        elif kind == "caps":
+            content = self._sentence(4, 10).upper() + "!!!"
+        elif kind == "blacklist":
+            words = self._sentence().split()
+            words.insert(rng.randint(0, len(words)), rng.choice(BLACKLIST))
+            content = " ".join(words)
+        else:
+            content = self._sentence()
+        message = FakeMessage(self._next_id, content, author, guild, channel, mentions, role_mentions, kind)
+        self._next_id += 1
+        return message
+
+    def stream(self, count: int) -> Iterator[FakeMessage]:
+        for _ in range(count):
+            yield self.message()
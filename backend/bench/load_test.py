@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import sys
+import time
+
+from .common import (
+    compare_stages,
+    environment_info,
+    load_baseline,
+    percentile,
+    print_stage_table,
+    summarize,
+    use_database,
+    write_baseline,
+)
+from .fixtures import FakeGuild
+
+
+BASELINE_NAME = "load_test"
+REPORT_DIR = Path(__file__).resolve().parent / "reports"
+DEFAULT_ROUTES = (
+    "/dashboard",
+    "/analytics?range_param=7d",
+    "/logs",
+    "/notifications",
+    "/servers",
+)
+
+
+def stub_bot_manager(guild_count: int) -> None:
+    # The read endpoints only need guild metadata from the bot, so replace the
+    # live-client accessors on the shared manager instead of connecting.
+    from app.discord_bot import bot_manager
+
+    guilds = [FakeGuild(id=100_000 + i, name=f"Guild {i}", member_count=50 + (i * 37) % 5000) for i in range(guild_count)]
+    by_id = {guild.id: guild for guild in guilds}
+    bot_manager.guilds = lambda: guilds
+    bot_manager.get_guild = by_id.get
+    bot_manager.is_ready = lambda: True
+
+
+async def _drive_route(client, route: str, requests: int, concurrency: int) -> dict:
+    latencies: list[int] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter_ns()
+            try:
+                response = await client.get(route)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter_ns() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    stats = summarize(latencies)
+    stats["p95_us"] = round(percentile(sorted(latencies), 95) / 1000, 2)
+    stats["errors"] = errors
+    stats["requests_per_sec"] = round(len(latencies) / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+async def run(routes: list[str], requests: int, concurrency: int, base_url: str | None) -> dict[str, dict]:
+    import httpx
+
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60.0)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60.0)
+    results = {}
+    async with client:
+        for route in routes:
+            await client.get(route)
+            results[route] = await _drive_route(client, route, requests, concurrency)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the dashboard read endpoints against a seeded database.")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file (seeded in-process).")
+    parser.add_argument("--url", default=None, help="Drive a running server instead of the in-process ASGI app.")
+    parser.add_argument("--seed-logs", type=int, default=None, help="Seed this many log rows first (default: 20k for temp SQLite).")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per route.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--route", action="append", dest="routes", help="Route to drive; repeatable.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    database_url = use_database(args.database_url)
+    seed_logs = args.seed_logs
+    if seed_logs is None and args.database_url is None:
+        seed_logs = 20_000
+    seeded = None
+    if seed_logs:
+        from .seed import seed
+
+        seeded = seed(seed_logs, args.guilds, users=50_000, days=args.days)
+        print(f"Seeded {seeded['logs']} log rows in {seeded['seconds']}s")
+    stub_bot_manager(args.guilds)
+
+    routes = args.routes or list(DEFAULT_ROUTES)
+    results = asyncio.run(run(routes, args.requests, args.concurrency, args.url))
+    report = {
+        "environment": environment_info(database_url),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "guilds": args.guilds,
+            "seeded_logs": seeded["logs"] if seeded else None,
+            "target": args.url or "asgi",
+        },
+        "stages": results,
+    }
+
+    baseline = load_baseline(BASELINE_NAME)
+    print_stage_table(results, baseline.get("stages") if baseline else None)
+    for route, stats in results.items():
+        print(f"{route:<36}{stats['requests_per_sec']:>10} req/s  errors={stats['errors']}")
+
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report_path = REPORT_DIR / f"load-{stamp}.json"
+    report_path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print(f"Report written to {report_path}")
+
+    if args.update_baseline:
+        print(f"Baseline written to {write_baseline(BASELINE_NAME, report)}")
+        return 0
+    if baseline and baseline.get("config") != report["config"]:
+        print("Baseline was recorded with a different configuration; skipping comparison.")
+    elif baseline:
+        regressions = compare_stages(results, baseline.get("stages", {}), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from .common import (
+    StageTimer,
+    compare_stages,
+    environment_info,
+    load_baseline,
+    print_stage_table,
+    use_database,
+    write_baseline,
+)
+from .fixtures import BENCH_AUTOMOD, COMMANDS, MessageFactory
+
+
+BASELINE_NAME = "message_path"
+
+SYNC_STAGES = (
+    ("_violates_automod", "automod"),
+    ("_count_emojis", "count_emojis"),
+    ("_increment_command_usage_sync", "db.increment_usage"),
+)
+ASYNC_STAGES = (
+    ("_moderate", "moderation"),
+    ("_handle_prefix_command", "prefix_command"),
+    ("_log_action", "log_action"),
+)
+
+
+def _seed(factory: MessageFactory) -> None:
+    from app.database import SessionLocal
+    from app.models import CommandModel, LogEntryModel, ServerSettingsModel
+
+    session = SessionLocal()
+    try:
+        session.query(LogEntryModel).delete()
+        session.query(CommandModel).delete()
+        session.query(ServerSettingsModel).delete()
+        for name in COMMANDS:
+            if name == "unknown":
+                continue
+            session.add(
+                CommandModel(name=name, category="utility", description=f"{name} response", usage=0, enabled=True, cooldown="0s")
+            )
+        for guild in factory.guilds:
+            session.add(ServerSettingsModel(guild_id=guild.id, prefix=factory.prefix, language="english", modules=[]))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _build_manager(timer: StageTimer):
+    from app.discord_bot import DEFAULT_SETTINGS, DiscordBotManager
+
+    manager = DiscordBotManager()
+    manager._settings = {**DEFAULT_SETTINGS, "automod": dict(BENCH_AUTOMOD)}
+    if hasattr(manager, "guild_configs"):
+        manager.guild_configs.set_defaults(manager._settings)
+    for attr, stage in SYNC_STAGES:
+        if hasattr(manager, attr):
+            timer.wrap_sync(manager, attr, stage)
+    for attr, stage in ASYNC_STAGES:
+        if hasattr(manager, attr):
+            timer.wrap_async(manager, attr, stage)
+    return manager
+
+
+async def run(messages: int, warmup: int, seed: int) -> tuple[dict, dict]:
+    factory = MessageFactory(seed=seed)
+    _seed(factory)
+    timer = StageTimer()
+    manager = _build_manager(timer)
+    handler = manager.client.on_message
+    # on_message only enqueues; waiting for the pipeline to empty keeps each
+    # sample the full time to process that message.
+    pipeline = getattr(manager, "pipeline", None)
+
+    for message in factory.stream(warmup):
+        await handler(message)
+        if pipeline is not None:
+            await pipeline.drain()
+    timer.samples.clear()
+
+    kinds: dict[str, int] = {}
+    started = time.perf_counter_ns()
+    for message in factory.stream(messages):
+        kinds[message.kind] = kinds.get(message.kind, 0) + 1
+        t0 = time.perf_counter_ns()
+        await handler(message)
+        if pipeline is not None:
+            await pipeline.drain()
+        timer.record("on_message", time.perf_counter_ns() - t0)
+        timer.record(f"on_message[{message.kind}]", time.perf_counter_ns() - t0)
+    deletes = getattr(manager, "automod_deletes", None)
+    if deletes is not None:
+        await deletes.close()
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+
+    summary = {
+        "messages": messages,
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(messages / elapsed, 1) if elapsed else 0.0,
+        "content_mix": dict(sorted(kinds.items())),
+    }
+    return summary, timer.report()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the on_message hot path against a local database.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50/p99 slowdown before flagging.")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this path.")
+    args = parser.parse_args(argv)
+
+    database_url = use_database(args.database_url)
+    summary, stages = asyncio.run(run(args.messages, args.warmup, args.seed))
+    report = {"environment": environment_info(database_url), "summary": summary, "stages": stages}
+
+    baseline = load_baseline(BASELINE_NAME)
+    print(f"{summary['messages']} messages in {summary['seconds']}s -> {summary['messages_per_sec']} msg/s")
+    print_stage_table(stages, baseline.get("stages") if baseline else None)
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    if args.update_baseline:
+        print(f"Baseline written to {write_baseline(BASELINE_NAME, report)}")
+        return 0
+    if baseline:
+        regressions = compare_stages(stages, baseline.get("stages", {}), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
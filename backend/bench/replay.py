@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from .common import StageTimer, environment_info, percentile, print_stage_table, use_database
+from .fixtures import BENCH_AUTOMOD, FakeChannel, FakeGuild, FakeMember, FakeMessage, FakeRole
+from .message_path import ASYNC_STAGES, SYNC_STAGES
+
+
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE")
+SAMPLE_SECONDS = 0.1
+
+
+class World:
+    # Stand-ins for the Discord objects behind each pseudonymous id, built on
+    # first sight so the same id always maps to the same object.
+    def __init__(self) -> None:
+        self.guilds: dict[int, FakeGuild] = {}
+        self.channels: dict[int, FakeChannel] = {}
+        self.members: dict[tuple[int, int], FakeMember] = {}
+        self.roles = [FakeRole(id=900 + r, name=f"role{r}") for r in range(8)]
+        self._next_id = 1
+
+    def guild(self, guild_id: int) -> FakeGuild:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(id=guild_id, name=f"guild-{guild_id:x}")
+        return guild
+
+    def channel(self, guild: FakeGuild, channel_id: int) -> FakeChannel:
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id, f"channel-{channel_id:x}", guild)
+            guild.text_channels.append(channel)
+        return channel
+
+    def member(self, guild: FakeGuild, user_id: int, bot: bool = False) -> FakeMember:
+        member = self.members.get((guild.id, user_id))
+        if member is None:
+            name = f"user-{user_id:x}"
+            member = self.members[(guild.id, user_id)] = FakeMember(
+                id=user_id, display_name=name, bot=bot, name=name, guild=guild
+            )
+        return member
+
+    def build(self, record: dict) -> tuple:
+        guild = self.guild(record["g"])
+        event = record["e"]
+        if event == "message":
+            message = FakeMessage(
+                self._next_id,
+                record.get("x", ""),
+                self.member(guild, record["u"], bool(record.get("b"))),
+                guild,
+                self.channel(guild, record["c"]),
+                [self.member(guild, user_id) for user_id in record.get("m", ())],
+                self.roles[: record.get("r", 0)],
+                kind="command" if "k" in record else "recorded",
+            )
+            self._next_id += 1
+            return (message,)
+        if event in ("member_join", "member_remove"):
+            return (self.member(guild, record["u"]),)
+        return (guild,)
+
+
+def load_events(path: str, limit: int | None) -> list[dict]:
+    from app.event_recorder import read_recording
+
+    events = []
+    for record in read_recording(path):
+        events.append(record)
+        if limit and len(events) >= limit:
+            break
+    events.sort(key=lambda record: record["t"])
+    return events
+
+
+def _seed(events: list[dict]) -> None:
+    # Commands and prefixes seen in the recording, so command messages take
+    # the same lookup and usage-write path they took live.
+    from app.database import SessionLocal
+    from app.models import CommandModel, LogEntryModel, ServerSettingsModel
+
+    commands = {record["k"] for record in events if "k" in record}
+    prefixes = {record["g"]: record["p"] for record in events if "p" in record}
+    session = SessionLocal()
+    try:
+        session.query(LogEntryModel).delete()
+        session.query(CommandModel).delete()
+        session.query(ServerSettingsModel).delete()
+        for name in sorted(commands):
+            session.add(
+                CommandModel(name=name, category="utility", description=f"{name} response", usage=0, enabled=True, cooldown="0s")
+            )
+        for guild_id, prefix in prefixes.items():
+            session.add(ServerSettingsModel(guild_id=guild_id, prefix=prefix, language="english", modules=[]))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _build_manager(timer: StageTimer, blacklist: list[str] | None):
+    from app.discord_bot import DEFAULT_SETTINGS, DiscordBotManager
+    from app.event_recorder import event_recorder
+
+    # Never re-record the replay itself.
+    event_recorder.path = None
+    manager = DiscordBotManager()
+    automod = dict(BENCH_AUTOMOD)
+    if blacklist is not None:
+        automod["wordBlacklist"] = blacklist
+    manager._settings = {**DEFAULT_SETTINGS, "automod": automod}
+    manager.guild_configs.set_defaults(manager._settings)
+    # Stubbed client: guild joins must not try to sync slash commands.
+    manager.slash.schedule = lambda *_args, **_kwargs: None
+    for attr, stage in SYNC_STAGES:
+        if hasattr(manager, attr):
+            timer.wrap_sync(manager, attr, stage)
+    for attr, stage in ASYNC_STAGES:
+        if hasattr(manager, attr):
+            timer.wrap_async(manager, attr, stage)
+    return manager
+
+
+class WriteCounter:
+    # INSERT/UPDATE/DELETE statements per second of replay wall time.
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.per_second: list[int] = []
+        self.by_verb = {verb: 0 for verb in WRITE_VERBS}
+
+    def __call__(self, _conn, _cursor, statement, _parameters, _context, executemany) -> None:
+        verb = statement.lstrip()[:6].upper()
+        if verb not in self.by_verb:
+            return
+        self.by_verb[verb] += 1
+        second = int(time.perf_counter() - self.started)
+        if second >= len(self.per_second):
+            self.per_second.extend([0] * (second + 1 - len(self.per_second)))
+        self.per_second[second] += 1
+
+    def report(self) -> dict:
+        total = sum(self.by_verb.values())
+        seconds = max(len(self.per_second), 1)
+        return {
+            "total": total,
+            "by_statement": dict(self.by_verb),
+            "per_sec_mean": round(total / seconds, 1),
+            "per_sec_peak": max(self.per_second, default=0),
+        }
+
+
+async def replay(events: list[dict], speed: float, blacklist: list[str] | None) -> tuple[dict, dict, dict]:
+    from sqlalchemy import event
+
+    from app.active_users import active_users
+    from app.database import engine
+    from app.leveling import xp_engine
+
+    _seed(events)
+    timer = StageTimer()
+    manager = _build_manager(timer, blacklist)
+    world = World()
+    writes = WriteCounter()
+    event.listen(engine, "after_cursor_execute", writes)
+    # The write-behind flushers run on their production cadence, so their
+    # share of the write rate scales with replay speed like it would live.
+    background = [asyncio.create_task(xp_engine.run()), asyncio.create_task(active_users.run())]
+
+    inflight: set[asyncio.Task] = set()
+    depth_samples: list[int] = []
+    backlog_samples: list[int] = []
+    shed: dict[str, int] = {}
+    submit = manager.pipeline.submit
+
+    def counting_submit(guild_id, priority, stage, func, *args):
+        accepted = submit(guild_id, priority, stage, func, *args)
+        if not accepted:
+            shed[stage] = shed.get(stage, 0) + 1
+        return accepted
+
+    manager.pipeline.submit = counting_submit
+    kinds: dict[str, int] = {}
+    errors: dict[str, int] = {}
+
+    async def dispatch(name: str, handler, args: tuple) -> None:
+        started = time.perf_counter_ns()
+        try:
+            await handler(*args)
+        except Exception as exc:
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+        finally:
+            timer.record(f"on_{name}", time.perf_counter_ns() - started)
+
+    async def sample() -> None:
+        while True:
+            depth_samples.append(len(inflight))
+            backlog_samples.append(manager.pipeline.depth)
+            await asyncio.sleep(SAMPLE_SECONDS)
+
+    sampler = asyncio.create_task(sample())
+    base = events[0]["t"] if events else 0
+    max_depth = 0
+    started = time.perf_counter()
+    writes.started = started
+    try:
+        for record in events:
+            name = record["e"]
+            handler = getattr(manager.client, f"on_{name}", None)
+            if handler is None:
+                continue
+            due = (record["t"] - base) / 1000 / speed if speed > 0 else 0.0
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif speed <= 0 and len(inflight) >= 1000:
+                # Back-to-back mode still yields so handlers make progress.
+                await asyncio.sleep(0)
+            timer.record("dispatch_lag", max(0, int((time.perf_counter() - started - due) * 1e9)))
+            kinds[name] = kinds.get(name, 0) + 1
+            task = asyncio.create_task(dispatch(name, handler, world.build(record)))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+            max_depth = max(max_depth, len(inflight))
+        if inflight:
+            await asyncio.gather(*inflight)
+        await manager.pipeline.drain()
+        await manager.automod_deletes.close()
+        elapsed = time.perf_counter() - started
+        await xp_engine.flush()
+        await active_users.flush()
+    finally:
+        for task in (sampler, *background):
+            task.cancel()
+        event.remove(engine, "after_cursor_execute", writes)
+
+    depths = sorted(depth_samples)
+    backlog = sorted(backlog_samples)
+    recorded = (events[-1]["t"] - base) / 1000 if events else 0.0
+    summary = {
+        "events": sum(kinds.values()),
+        "event_mix": dict(sorted(kinds.items())),
+        "speed": speed,
+        "recorded_seconds": round(recorded, 3),
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(sum(kinds.values()) / elapsed, 1) if elapsed else 0.0,
+        "errors": dict(sorted(errors.items())),
+        "queue": {
+            "max_in_flight": max_depth,
+            "p50_in_flight": percentile(depths, 50) if depths else 0,
+            "p99_in_flight": percentile(depths, 99) if depths else 0,
+            "max_pipeline_depth": backlog[-1] if backlog else 0,
+            "p50_pipeline_depth": percentile(backlog, 50) if backlog else 0,
+            "p99_pipeline_depth": percentile(backlog, 99) if backlog else 0,
+            "shed": dict(sorted(shed.items())),
+        },
+        "bulk_deletes": sum(channel.bulk_deletes for channel in world.channels.values()),
+        "guilds": len(world.guilds),
+        "users": len(world.members),
+    }
+    return summary, writes.report(), timer.report()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded gateway event log against a local database.")
+    parser.add_argument("path", help="Recording written with EVENT_RECORDING_PATH set.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier; 0 replays back to back.")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the first N events.")
+    parser.add_argument("--blacklist", default=None, help="Comma-separated automod blacklist; defaults to the bench list.")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file.")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this path.")
+    args = parser.parse_args(argv)
+
+    os.environ.pop("EVENT_RECORDING_PATH", None)
+    database_url = use_database(args.database_url)
+    events = load_events(args.path, args.limit)
+    if not events:
+        print(f"No events in {args.path}")
+        return 1
+    blacklist = [word.strip().lower() for word in args.blacklist.split(",") if word.strip()] if args.blacklist else None
+    summary, writes, stages = asyncio.run(replay(events, args.speed, blacklist))
+    report = {"environment": environment_info(database_url), "summary": summary, "db_writes": writes, "stages": stages}
+
+    queue = summary["queue"]
+    print(
+        f"{summary['events']} events ({summary['recorded_seconds']}s recorded) replayed at {args.speed:g}x "
+        f"in {summary['seconds']}s -> {summary['events_per_sec']} events/s"
+    )
+    if summary["errors"]:
+        print(f"handler errors: {summary['errors']}")
+    print(f"in-flight handlers: max {queue['max_in_flight']}, p50 {queue['p50_in_flight']}, p99 {queue['p99_in_flight']}")
+    print(
+        f"pipeline backlog: max {queue['max_pipeline_depth']}, p50 {queue['p50_pipeline_depth']}, "
+        f"p99 {queue['p99_pipeline_depth']}, shed {queue['shed'] or 'none'}"
+    )
+    print(
+        f"db writes: {writes['total']} total, {writes['per_sec_mean']}/s mean, {writes['per_sec_peak']}/s peak "
+        f"{writes['by_statement']}"
+    )
+    print_stage_table(stages)
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
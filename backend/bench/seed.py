@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import itertools
+import random
+import sys
+import time
+from typing import Iterator
+
+from .common import use_database
+
+
+ACTION_MIX = (
+    ("command", 0.45),
+    ("automod", 0.15),
+    ("join", 0.12),
+    ("message", 0.10),
+    ("leave", 0.08),
+    ("warn", 0.04),
+    ("mute", 0.03),
+    ("kick", 0.012),
+    ("ban", 0.006),
+    ("server_join", 0.001),
+    ("server_leave", 0.001),
+)
+COMMAND_NAMES = ["help", "ping", "rules", "rank", "play", "skip", "queue", "meme", "8ball", "poll", "userinfo", "serverinfo"]
+CATEGORIES = ["music", "fun", "moderation", "utility"]
+AUTOMOD_REASONS = ["Link filter", "Blacklisted word", "Too many mentions", "Excessive caps", "Too many emojis"]
+# Relative activity per UTC hour, so peak-hour charts have a realistic shape.
+HOURLY_WEIGHTS = [3, 2, 1, 1, 1, 1, 2, 3, 4, 5, 5, 6, 6, 6, 7, 7, 8, 9, 10, 10, 9, 8, 6, 4]
+BATCH_SIZE = 20_000
+
+
+def _details(rng: random.Random, action: str, user: str) -> str:
+    if action == "command":
+        return rng.choice(COMMAND_NAMES)
+    if action == "automod":
+        return f"{rng.choice(AUTOMOD_REASONS)}: spam message {rng.randint(1, 99999)}"
+    if action in ("join", "leave"):
+        return f"{user} {'joined' if action == 'join' else 'left'}"
+    if action == "message":
+        return f"Announcement #{rng.randint(1, 5000)}"
+    if action == "mute":
+        return f"{user}: {rng.choice([5, 10, 30, 60])}m"
+    return f"{user}: rule {rng.randint(1, 12)}"
+
+
+def generate_logs(count: int, guilds: int, users: int, days: int, seed: int) -> Iterator[dict]:
+    rng = random.Random(seed)
+    actions = [a for a, _ in ACTION_MIX]
+    action_cum = list(itertools.accumulate(w for _, w in ACTION_MIX))
+    hours = list(range(24))
+    hour_cum = list(itertools.accumulate(HOURLY_WEIGHTS))
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=days)
+    # Skew activity toward a handful of large guilds, like real deployments.
+    guild_indexes = range(guilds)
+    guild_cum = list(itertools.accumulate(1.0 / (i + 1) for i in guild_indexes))
+    base_id = int(start.timestamp() * 1000)
+    span_ms = max(1, int((end - start).total_seconds() * 1000))
+    step = max(1, span_ms // max(1, count))
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        ts = day.replace(hour=rng.choices(hours, cum_weights=hour_cum)[0], minute=rng.randrange(60), second=rng.randrange(60))
+        if ts > end:
+            ts = end - timedelta(seconds=rng.randrange(3600))
+        action = rng.choices(actions, cum_weights=action_cum)[0]
+        guild_index = rng.choices(guild_indexes, cum_weights=guild_cum)[0]
+        user = f"user{rng.randrange(users)}"
+        yield {
+            "id": base_id + i * step,
+            "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+            "server": f"Guild {guild_index}",
+            "user": user if action not in ("server_join", "server_leave") else "bot",
+            "action": action,
+            "details": _details(rng, action, user),
+            "level": "warning" if action in ("automod", "warn", "kick", "ban") else "info",
+        }
+
+
+def _copy_logs(engine, rows: Iterator[dict]) -> int:
+    columns = ("id", "timestamp", "server", "user", "action", "details", "level")
+    written = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        with cursor.copy('COPY bot_logs (id, timestamp, server, "user", action, details, level) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(tuple(row[c] for c in columns))
+                written += 1
+        raw.commit()
+    finally:
+        raw.close()
+    return written
+
+
+def _insert_logs(engine, rows: Iterator[dict]) -> int:
+    from sqlalchemy import insert
+
+    from app.models import LogEntryModel
+
+    written = 0
+    batch: list[dict] = []
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                conn.execute(insert(LogEntryModel), batch)
+                written += len(batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(LogEntryModel), batch)
+            written += len(batch)
+    return written
+
+
+def seed(logs: int, guilds: int, users: int, days: int, seed_value: int = 7) -> dict:
+    from app.database import SessionLocal, engine
+    from app.models import CommandModel, LogEntryModel, ServerSettingsModel
+
+    rng = random.Random(seed_value)
+    session = SessionLocal()
+    try:
+        session.query(LogEntryModel).delete()
+        session.query(CommandModel).delete()
+        session.query(ServerSettingsModel).delete()
+        for name in COMMAND_NAMES:
+            session.add(
+                CommandModel(
+                    name=name,
+                    category=rng.choice(CATEGORIES),
+                    description=f"{name} response",
+                    usage=rng.randint(0, logs // len(COMMAND_NAMES) + 1),
+                    enabled=rng.random() > 0.1,
+                    cooldown=rng.choice(["0s", "3s", "10s", "1m"]),
+                )
+            )
+        for index in range(guilds):
+            session.add(
+                ServerSettingsModel(
+                    guild_id=100_000 + index,
+                    prefix=rng.choice(["!", "?", "$", "!"]),
+                    language=rng.choice(["english", "english", "spanish", "german"]),
+                    modules=rng.sample(["moderation", "utility", "music", "fun", "leveling"], rng.randint(1, 4)),
+                )
+            )
+        session.commit()
+    finally:
+        session.close()
+
+    started = time.perf_counter()
+    rows = generate_logs(logs, guilds, users, days, seed_value)
+    if engine.dialect.name == "postgresql":
+        written = _copy_logs(engine, rows)
+    else:
+        written = _insert_logs(engine, rows)
+    return {"logs": written, "guilds": guilds, "users": users, "days": days, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Seed bot_logs, bot_commands and server_settings with synthetic data.")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file.")
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    database_url = use_database(args.database_url)
+    result = seed(args.logs, args.guilds, args.users, args.days, args.seed)
+    print(f"Seeded {database_url}: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())